@@ -1,17 +1,55 @@
 import pandas as pd
 import dash
-from dash import dcc, html, dash_table
+from dash import dcc, html, dash_table, ctx, Patch
 import plotly.express as px
 import plotly.graph_objects as go
 import random
 import numpy as np
-from faker import Faker
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 from io import StringIO
 import base64
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import flask
+import plotly.io as pio
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import flask_compress
+except ImportError:
+    flask_compress = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
 
 # Set random seeds for reproducibility
-fake = Faker()
 np.random.seed(42)
 random.seed(42)
 
@@ -36,421 +74,2553 @@ promo_events = ['Discount', 'Flash Sale', 'Buy1Get1', 'None']
 salespersons = ['John Doe', 'Jane Smith', 'Alex Brown', 'Emily Davis', 'Michael Chen', 'Sarah Lee', 'David Kim', 'Laura Wilson', 'Chris Taylor', 'Anna Patel']
 marketing_channels = ['LinkedIn', 'Facebook', 'Twitter', 'Email', 'Direct']
 
-seen = set()
-data = []
 conversion_rate_target = 0.05  # 5% conversion rate
 data_gen_start_date = pd.to_datetime('2022-05-01')
 base_target = 10000  # Monthly sales target per salesperson ($10,000)
-while len(data) < num_rows:
-    date = random.choice(date_range)
-    country = random.choice(countries)
-    job_title = random.choice(job_titles)
-    product = random.choice(products)
-    region = regions[countries.index(country) % len(regions)]
-    salesperson = random.choice(salespersons)
-    channel = random.choice(marketing_channels)
-    unit_price = round(random.uniform(20, 200), 2)
-    quantity = random.randint(1, 5)
-    days_since_start = (date - data_gen_start_date).days
+
+# Draw whole columns at once and drop repeated (country, product, job_title, promo_event, date, salesperson, channel)
+# combos. Each combo is packed into a single int64 key built from the per-column codes, so deduplication is a sorted
+# array lookup instead of a Python set of tuples. Rows keep their draw order, so the first occurrence of a combo wins.
+def generate_weblog(num_rows, seed=42, batch_factor=1.1):
+    rng = np.random.default_rng(seed)
+    dates = pd.DatetimeIndex(date_range)
+    day_offsets = (dates - data_gen_start_date).days.to_numpy()
+    combo_columns = ['date', 'country', 'product', 'job_title', 'promo_event', 'salesperson', 'channel']
+    dims = [len(dates), len(countries), len(products), len(job_titles), len(promo_events), len(salespersons), len(marketing_channels)]
+
+    parts = []
+    seen = np.empty(0, dtype=np.int64)
+    rows = 0
+    while rows < num_rows:
+        size = max(int((num_rows - rows) * batch_factor), 1024)
+        batch = {name: rng.integers(0, n, size=size, dtype=np.int16) for name, n in zip(combo_columns, dims)}
+        batch['unit_price'] = np.round(rng.uniform(20, 200, size=size), 2)
+        batch['quantity'] = rng.integers(1, 6, size=size, dtype=np.int8)
+        batch['converted'] = rng.random(size=size) < conversion_rate_target
+        batch['user_engagement'] = rng.integers(1, 11, size=size, dtype=np.int8)
+
+        keys = np.zeros(size, dtype=np.int64)
+        for name, n in zip(combo_columns, dims):
+            keys = keys * n + batch[name]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        first = np.ones(size, dtype=bool)
+        first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        pos = np.searchsorted(seen, sorted_keys[first])
+        known = seen[np.minimum(pos, len(seen) - 1)] == sorted_keys[first] if len(seen) else np.zeros(len(pos), dtype=bool)
+        fresh = np.sort(order[first][~known])[:num_rows - rows]
+        seen = np.sort(np.concatenate([seen, keys[fresh]]))
+        parts.append({name: values[fresh] for name, values in batch.items()})
+        rows += len(fresh)
+    col = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+    days_since_start = day_offsets[col['date']]
     growth_factor = 1 + 0.000274 * days_since_start  # ~10% annual growth
-    sales = (unit_price * quantity * growth_factor) if random.random() < conversion_rate_target else 0
-    user_engagement = random.randint(1, 10)
-    promo_event = random.choice(promo_events)
+    sales = np.where(col['converted'], col['unit_price'] * col['quantity'] * growth_factor, 0.0)
     # Calculate monthly target (10% annual increase)
     months_since_start = days_since_start // 30
     monthly_target = base_target * (1 + 0.00833 * months_since_start)  # ~10% annual (0.833% monthly)
-    combo = (country, product, job_title, promo_event, date.date(), salesperson, channel)
-    if combo not in seen:
-        seen.add(combo)
-        converted = 1 if sales > 0 else 0
-        data.append([date, country, region, product, job_title, sales, user_engagement, promo_event, converted, salesperson, channel, monthly_target, unit_price])
+    country_region = np.array([regions[i % len(regions)] for i in range(len(countries))], dtype=object)
+
+    return pd.DataFrame({
+        'date': dates[col['date']],
+        'country': np.array(countries, dtype=object)[col['country']],
+        'region': country_region[col['country']],
+        'product': np.array(products, dtype=object)[col['product']],
+        'job_title': np.array(job_titles, dtype=object)[col['job_title']],
+        'sales': sales,
+        'user_engagement': col['user_engagement'].astype(int),
+        'promo_event': np.array(promo_events, dtype=object)[col['promo_event']],
+        'converted': (sales > 0).astype(int),
+        'salesperson': np.array(salespersons, dtype=object)[col['salesperson']],
+        'marketing_channel': np.array(marketing_channels, dtype=object)[col['channel']],
+        'sales_target': monthly_target,
+        'unit_price': col['unit_price'],
+    })
+
+# Add the derived and simulated columns the dashboard works with
+def prepare_dataset(df, seed=42):
+    rng = np.random.default_rng(seed + 1)
+
+    # Calculate cost and profit_margin per row
+    df['cost'] = df['sales'] * rng.uniform(0.5, 0.7, size=len(df))
+    df['profit_margin'] = ((df['sales'] - df['cost']) / df['sales'] * 100).round(2).fillna(0)
+
+    # Simulate missing columns
+    df['age_group'] = rng.choice(['18-25', '26-35', '36-45', '46+'], size=len(df))
+    df['session_duration'] = rng.uniform(30, 300, size=len(df))
+    df['job_status'] = rng.choice(['Pending', 'In Progress', 'Completed'], size=len(df))
+    df['job_priority'] = rng.choice(['Low', 'Medium', 'High'], size=len(df))
+    df['log_type'] = rng.choice(['Info', 'Error', 'Warning'], size=len(df))
+    df['month'] = df['date'].dt.to_period('M').astype(str)
+    df['quantity'] = (df['sales'] / df['unit_price']).where(df['sales'] > 0, 0).round().clip(1, 5)
+    return df
+
+# Compact in-memory schema
+# Low-cardinality strings are stored as categoricals with a fixed category order and small numerics are downcast.
+# Money columns (sales, sales_target, cost) stay float64 so dashboard totals keep their cents. The Logs tab `details`
+# text is not stored at all; build_details() derives it for the rows that are actually displayed.
+age_groups = ['18-25', '26-35', '36-45', '46+']
+job_statuses = ['Pending', 'In Progress', 'Completed']
+job_priorities = ['Low', 'Medium', 'High']
+log_types = ['Info', 'Error', 'Warning']
+
+CATEGORY_COLUMNS = {
+    'country': countries,
+    'region': regions,
+    'product': products,
+    'job_title': job_titles,
+    'promo_event': promo_events,
+    'salesperson': salespersons,
+    'marketing_channel': marketing_channels,
+    'age_group': age_groups,
+    'job_status': job_statuses,
+    'job_priority': job_priorities,
+    'log_type': log_types,
+}
+DOWNCAST_COLUMNS = {
+    'user_engagement': 'int8',
+    'quantity': 'int8',
+    'converted': 'int8',
+    'unit_price': 'float32',
+    'profit_margin': 'float32',
+    'session_duration': 'float32',
+}
+
+def apply_schema(df):
+    for col, categories in CATEGORY_COLUMNS.items():
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = pd.Categorical(df[col], categories=categories)
+    if not isinstance(df['month'].dtype, pd.CategoricalDtype):
+        df['month'] = pd.Categorical(df['month'], categories=sorted(df['month'].unique()), ordered=True)
+    for col, dtype in DOWNCAST_COLUMNS.items():
+        df[col] = df[col].astype(dtype)
+    return df.drop(columns=['details'], errors='ignore')
+
+def build_details(frame):
+    return (frame['job_title'].astype(str) + ' - ' + frame['log_type'].astype(str) + ' - '
+            + frame['salesperson'].astype(str))
 
-df = pd.DataFrame(data, columns=['date', 'country', 'region', 'product', 'job_title', 'sales', 'user_engagement', 'promo_event', 'converted', 'salesperson', 'marketing_channel', 'sales_target', 'unit_price'])
-df.to_csv('weblog.csv', index=False)
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+# Dataset cache
+# The prepared frame is stored as Parquet under DATA_DIR and reused on the next start as long as the generator
+# parameters and SCHEMA_VERSION match. Bump SCHEMA_VERSION whenever prepare_dataset() changes the columns it produces.
+SCHEMA_VERSION = 3
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR', 'data')
+# Small row groups let Parquet readers skip whole date ranges using the row-group min/max statistics
+PARQUET_ROW_GROUP_ROWS = 65536
+# 'arrow': keep an uncompressed Arrow IPC copy of the dataset (and the cube) next to the Parquet file and memory-map it
+# read-only. Columns are zero-copy views of the mapped file, so every process serving the app (e.g. gunicorn workers)
+# shares the same page-cache pages instead of holding a private copy, and startup skips decoding Parquet.
+DATASET_FORMAT = os.environ.get('DASHBOARD_DATASET_FORMAT', 'parquet')
+
+def dataset_key(num_rows, seed=42):
+    params = {
+        'schema_version': SCHEMA_VERSION,
+        'num_rows': num_rows,
+        'seed': seed,
+        'start_date': str(start_date.date()),
+        'end_date': str(end_date.date()),
+        'countries': countries,
+        'job_titles': job_titles,
+        'products': products,
+        'regions': regions,
+        'promo_events': promo_events,
+        'salespersons': salespersons,
+        'marketing_channels': marketing_channels,
+        'conversion_rate_target': conversion_rate_target,
+        'base_target': base_target,
+    }
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+def dataset_path(num_rows, seed=42, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f'weblog-{dataset_key(num_rows, seed)}.parquet')
+
+def write_arrow(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    # Same temporary-file-and-rename as the Parquet cache: workers starting together may race to write it
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def map_arrow(path):
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    # split_blocks keeps one array per column, so numeric columns and categorical codes stay views of the mapping
+    return table.to_pandas(split_blocks=True)
+
+def load_dataset(num_rows, seed=42, data_dir=DATA_DIR):
+    path = dataset_path(num_rows, seed, data_dir)
+    if DATASET_FORMAT == 'arrow':
+        arrow_path = path.replace('.parquet', '.arrow')
+        if not os.path.exists(arrow_path):
+            write_arrow(load_parquet_dataset(num_rows, seed, data_dir), arrow_path)
+        return map_arrow(arrow_path)
+    return load_parquet_dataset(num_rows, seed, data_dir)
+
+def load_parquet_dataset(num_rows, seed=42, data_dir=DATA_DIR):
+    path = dataset_path(num_rows, seed, data_dir)
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    df = prepare_dataset(generate_weblog(num_rows, seed), seed)
+    # Keep rows physically ordered by date so date ranges resolve to contiguous slices
+    df = df.sort_values('date', kind='stable', ignore_index=True)
+    before = memory_mb(df)
+    df = apply_schema(df)
+    print(f"Dataset memory: {before:.1f} MB as generated, {memory_mb(df):.1f} MB with compact schema")
+    os.makedirs(data_dir, exist_ok=True)
+    # Write to a temporary file first so a concurrent reader never sees a half-written dataset
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_parquet(tmp_path, index=False, row_group_size=PARQUET_ROW_GROUP_ROWS)
+    os.replace(tmp_path, path)
+    return df
+
+def metadata_path(num_rows, seed=42, data_dir=DATA_DIR):
+    return dataset_path(num_rows, seed, data_dir).replace('.parquet', '.json')
+
+def frame_metadata(frame):
+    # What the layout needs (date bounds and dropdown options), so it can be built without loading the dataset
+    return {
+        'rows': len(frame),
+        'min_date': frame['date'].min().isoformat(),
+        'max_date': frame['date'].max().isoformat(),
+        'regions': [str(value) for value in frame['region'].unique()],
+        'salespersons': [str(value) for value in frame['salesperson'].unique()],
+        'marketing_channels': [str(value) for value in frame['marketing_channel'].unique()],
+    }
+
+def write_metadata(metadata, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(tmp_path, path)
+
+def load_metadata():
+    path = metadata_path(num_rows, data_dir=DATA_DIR)
+    if not os.path.exists(path):
+        ensure_data()
+    with open(path) as f:
+        return json.load(f)
 
 # Load data
-df = pd.read_csv("weblog.csv", parse_dates=['date'])
-
-# Calculate cost and profit_margin per row
-df['cost'] = df['sales'] * np.random.uniform(0.5, 0.7, size=len(df))
-df['profit_margin'] = ((df['sales'] - df['cost']) / df['sales'] * 100).round(2).fillna(0)
-
-# Simulate missing columns
-df['age_group'] = np.random.choice(['18-25', '26-35', '36-45', '46+'], size=len(df))
-df['session_duration'] = np.random.uniform(30, 300, size=len(df))
-df['job_status'] = np.random.choice(['Pending', 'In Progress', 'Completed'], size=len(df))
-df['job_priority'] = np.random.choice(['Low', 'Medium', 'High'], size=len(df))
-df['log_type'] = np.random.choice(['Info', 'Error', 'Warning'], size=len(df))
-df['month'] = df['date'].dt.to_period('M').astype(str)
-df['quantity'] = (df['sales'] / df['unit_price']).where(df['sales'] > 0, 0).round().clip(1, 5)
-
-# Create details column for Logs Tab
-df['details'] = df['job_title'] + ' - ' + df['log_type'] + ' - ' + df['salesperson']
-
-# Initialize Dash app
-app = dash.Dash(__name__, external_stylesheets=[
-    'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
-    '/assets/styles.css'
-])
-app.title = "AI-Solutions Sales Dashboard"
-
-# KPIs
-total_sales = df['sales'].sum()
-total_users = len(df)
-conversion_rate = (df['converted'].sum() / total_users * 100) if total_users > 0 else 0
-sales_by_product = df.groupby('product')['sales'].sum().reset_index()
-top_product = sales_by_product.loc[sales_by_product['sales'].idxmax(), 'product'] if not sales_by_product.empty else "N/A"
-low_product = sales_by_product.loc[sales_by_product['sales'].idxmin(), 'product'] if not sales_by_product.empty else "N/A"
-avg_profit_margin = df['profit_margin'].mean().round(2)
-
-# Placeholder data for promotion_data
-promotion_data = [
-    {'promo_event': e, 'start_date': '2022-05-01', 'end_date': '2025-03-31', 'target': 'All', 'redemption_rate': random.uniform(0.1, 0.5)}
-    for e in promo_events
+# Nothing is loaded at import time: ensure_data() (see "Lazy dataset" below) loads the frame and builds the indexes on
+# first use. `python dashboard.py build` prepares the files offline, so that first use only has to read them.
+#
+# The frame and everything derived from it form one snapshot, the dict in DATA:
+# - 'frame': the rows, sorted by date
+# - 'base_date', 'day_offsets': the date index (see below)
+# - 'bitmaps', 'partitions', 'cube': the bitmap indexes, month partitions and aggregate cube
+# - 'rows', 'last_date', 'dtypes': the row count, the last timestamp and the column dtypes
+# - 'revision', 'month_revisions', 'parts', 'parts_digest': what has been merged into it (see "Filter engine")
+# Snapshots are never modified: merging rows builds the next one beside the current one and publishes it with a single
+# assignment (see apply_new_parts), so readers take no lock. current_data() returns the snapshot and pins it for the
+# rest of the request, so a callback never mixes the row positions or versions of two snapshots. With the duckdb engine
+# the rows stay in the Parquet files and a snapshot only has 'base_date' and the last two groups.
+DATA = None
+
+def current_data():
+    if DATA is None or not flask.has_request_context():
+        return DATA
+    return flask.g.setdefault('data', DATA)
+
+# Date index
+# Rows are sorted by date, so their day offsets (days since the base date, the first day) are non-decreasing and any
+# inclusive range of calendar days is a contiguous slice found with two binary searches.
+def day_offsets(dates, base_date):
+    return ((dates - base_date) // pd.Timedelta(days=1)).to_numpy(dtype=np.int32)
+
+def day_window(days, start_date, end_date):
+    base_date = current_data()['base_date']
+    start_day = (pd.Timestamp(start_date).normalize() - base_date).days
+    end_day = (pd.Timestamp(end_date).normalize() - base_date).days
+    lo = np.searchsorted(days, start_day, side='left')
+    hi = np.searchsorted(days, end_day, side='right')
+    return slice(lo, max(lo, hi))
+
+def date_slice(start_date, end_date):
+    return day_window(current_data()['day_offsets'], start_date, end_date)
+
+# Bitmap indexes
+# One packed bitset (np.packbits, one bit per row) per value of each filter dimension. A filter combination is answered
+# by AND-ing the bitsets over the bytes covering the date slice and gathering the surviving rows once at the end.
+# Only the global filters are indexed: products and promotions are chart dimensions, which are grouped by, not filtered.
+BITMAP_COLUMNS = ['region', 'salesperson', 'marketing_channel']
+
+def build_bitmaps(df):
+    bitmaps = {}
+    for col in BITMAP_COLUMNS:
+        codes = df[col].cat.codes.to_numpy()
+        bitmaps[col] = {value: np.packbits(codes == code) for code, value in enumerate(df[col].cat.categories)}
+    return bitmaps
+
+def bitmap_rows(window, filters):
+    bitmaps = current_data()['bitmaps']
+    first_byte = window.start // 8
+    last_byte = (window.stop + 7) // 8
+    bits = None
+    for col, value in filters:
+        bitmap = bitmaps[col].get(value)
+        if bitmap is None:
+            return np.empty(0, dtype=np.int64)
+        if bits is None:
+            bits = bitmap[first_byte:last_byte].copy()
+        else:
+            np.bitwise_and(bits, bitmap[first_byte:last_byte], out=bits)
+    offset = window.start - first_byte * 8
+    mask = np.unpackbits(bits)[offset:offset + window.stop - window.start]
+    return window.start + np.flatnonzero(mask)
+
+# Filter engine
+# Every callback applies the same global filters, so the row selection is computed once per
+# (start_date, end_date, region, salesperson, channel) and shared through a bounded LRU cache. The cache key also carries
+# the dataset version, so entries computed against older data are never served. Merged rows only shift the row
+# positions from the first month they touch on, so row selections are keyed by rows_version(end_date): the latest
+# revision of any month up to the end of the window. Windows that end before the changed months keep their entries.
+#
+# data_version() identifies the content itself (the dataset key plus a digest of the merged part names, which are
+# never rewritten), so it means the same data in every process and after a restart; rendered tab inputs and the
+# result cache use it.
+#
+# A snapshot's 'revision' is bumped whenever ingested or uploaded rows are merged in this process, 'month_revisions'
+# maps each changed 'YYYY-MM' to the revision that last changed it, and 'parts_digest' is the digest of 'parts'.
+DATASET_VERSION = dataset_key(num_rows)
+
+def data_version():
+    data = current_data()
+    return f"{DATASET_VERSION}.{data['parts_digest']}" if data and data['parts_digest'] else DATASET_VERSION
+
+def rows_version(end_date):
+    month = pd.Timestamp(end_date).strftime('%Y-%m')
+    revision = max([rev for changed, rev in current_data()['month_revisions'].items() if changed <= month], default=0)
+    return f'{DATASET_VERSION}.{revision}'
+FILTER_CACHE_SIZE = 128
+
+@functools.lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _filter_rows(version, start_date, end_date, region, salesperson, channel):
+    window = date_slice(start_date, end_date)
+    filters = [(col, value) for col, value in zip(BITMAP_COLUMNS, [region, salesperson, channel]) if value != 'All']
+    if filters:
+        rows = bitmap_rows(window, filters)
+    else:
+        rows = np.arange(window.start, window.stop)
+    rows.setflags(write=False)
+    return rows
+
+def filter_rows(start_date, end_date, region, salesperson, channel):
+    start_date = pd.Timestamp(start_date).normalize()
+    end_date = pd.Timestamp(end_date).normalize()
+    return _filter_rows(rows_version(end_date), start_date, end_date, region, salesperson, channel)
+
+# Aggregate cube
+# Charts are sums and counts over a few dimensions, so they are answered from materialized aggregates at daily grain
+# instead of raw rows. Rows are grouped by calendar day (ingested events carry real times of day), so `date` in a
+# rollup is always midnight.
+#
+# Keying one table by date and all three filter dimensions (region, salesperson, marketing_channel) would make it
+# nearly as long as the rows themselves: up to 250 combinations a day against about 470 rows a day. The cube is a set of
+# narrow rollups instead (CUBE_ROLLUPS), each keyed by date and one chart or filter dimension and carrying only the
+# measures read from it, and a query is answered from the smallest rollup that has every dimension it filters or
+# groups by. Queries no rollup covers (say products for one region) aggregate the filtered rows instead: with a filter
+# set, the bitmap indexes leave at most a fifth of them.
+#
+# CUBE_VIEWS are what callbacks ask for: a chart dimension and the measures read by default. Queries group by any of
+# CUBE_DIMENSIONS (and month, day or year) on top.
+CUBE_DIMENSIONS = ['date', 'region', 'salesperson', 'marketing_channel']
+CUBE_MEASURES = ['sales', 'sales_target', 'cost', 'converted', 'quantity', 'user_engagement', 'session_duration',
+                 'profit_margin', 'engaged', 'rows']
+CUBE_VIEWS = {
+    'base': ([], CUBE_MEASURES),
+    'country': (['country'], ['sales', 'rows']),
+    'product': (['product'], ['sales', 'sales_target', 'rows']),
+    'promo_event': (['promo_event'], ['sales', 'quantity', 'rows']),
+    'age_group': (['age_group'], ['sales', 'user_engagement', 'session_duration', 'rows']),
+    'job_title': (['job_title'], ['user_engagement', 'rows']),
+}
+CUBE_ROLLUPS = {
+    'daily': ([], CUBE_MEASURES),
+    'region': (['region'], CUBE_MEASURES),
+    'salesperson': (['salesperson'], CUBE_MEASURES),
+    'channel': (['marketing_channel'], CUBE_MEASURES),
+    'country': (['country', 'region'], ['sales', 'rows']),  # every country is in one region
+    'product': (['product'], ['sales', 'sales_target', 'rows']),
+    'promo_event': (['promo_event'], ['sales', 'quantity', 'rows']),
+    'age_group': (['age_group'], ['sales', 'user_engagement', 'session_duration', 'rows']),
+    'job_title': (['job_title'], ['user_engagement', 'rows']),
+}
+TIME_DIMENSIONS = ['date', 'month', 'day', 'year']
+FACT_DIMENSIONS = list(dict.fromkeys(CUBE_DIMENSIONS + [dim for dims, _ in CUBE_ROLLUPS.values() for dim in dims]))
+
+def fact_measure(df, measure, rows=slice(None)):
+    # What a cube measure sums for each of the given rows
+    values = df['user_engagement' if measure in ('engaged', 'rows') else measure].to_numpy()[rows]
+    if measure == 'rows':
+        return np.ones(len(values), dtype=np.int32)
+    if measure == 'engaged':
+        return (values > 5).astype(np.int32)  # Engagement threshold used for retention
+    return values.astype(np.int32 if values.dtype.kind in 'iub' else np.float64)
+
+def cube_facts(df):
+    # One row per raw row: the dimensions, the date truncated to its day and every measure
+    return df[FACT_DIMENSIONS].assign(date=df['date'].dt.normalize(),
+                                      **{measure: fact_measure(df, measure) for measure in CUBE_MEASURES})
+
+def build_cube(df, base_date):
+    facts = cube_facts(df)
+    cube = {}
+    for rollup, (dims, measures) in CUBE_ROLLUPS.items():
+        agg = facts.groupby(['date'] + dims, observed=True, sort=True)[measures].sum().reset_index()
+        counts = [col for col in measures if pd.api.types.is_integer_dtype(agg[col])]
+        agg[counts] = agg[counts].astype(np.int32)
+        agg['month'] = pd.Categorical(agg['date'].dt.to_period('M').astype(str), categories=df['month'].cat.categories,
+                                      ordered=True)
+        agg['day'] = day_offsets(agg['date'], base_date)
+        agg['year'] = agg['date'].dt.year.astype(np.int16)
+        cube[rollup] = agg
+    return cube
+
+def load_cube(df, base_date, stored=True):
+    # The stored cube only matches the stored dataset, not one with ingested parts folded in
+    if DATASET_FORMAT != 'arrow' or not stored:
+        return build_cube(df, base_date)
+    rollups = json.dumps(CUBE_ROLLUPS, sort_keys=True)
+    key = hashlib.sha1(f'{DATASET_VERSION}{rollups}'.encode()).hexdigest()[:12]
+    paths = {rollup: os.path.join(DATA_DIR, f'cube-{key}-{rollup}.arrow') for rollup in CUBE_ROLLUPS}
+    if not all(os.path.exists(path) for path in paths.values()):
+        for rollup, agg in build_cube(df, base_date).items():
+            write_arrow(agg, paths[rollup])
+    return {rollup: map_arrow(path) for rollup, path in paths.items()}
+
+# Query engines
+# cube_query() is answered by the engine named in DASHBOARD_QUERY_ENGINE:
+# - 'pandas' (default): the in-memory cube above.
+# - 'duckdb': SQL over the Parquet dataset and its merged parts, so the rows are never loaded and the dataset may be
+#   larger than memory. Its snapshots have no frame, indexes or cube, only the date range, row count and dtypes of the
+#   rows (see duckdb_snapshot), and the row-level views are SQL too: the Logs table pages with ORDER BY/LIMIT, the
+#   promotion box plot takes quantile_cont per promotion and hourly trends group by date_trunc('hour', date). Filters
+#   are pushed down to the Parquet scan (the file is date-sorted, so date ranges skip whole row groups) and the
+#   group-by runs on all cores. Results are cast back to the dataset's dtypes and category order, so callbacks see
+#   identical frames.
+# - 'pool': map-reduce over month partitions of the raw rows on a persistent process pool (see below).
+# `python dashboard.py compare-engines` runs every cube view through both engines and reports any differences.
+QUERY_ENGINE = os.environ.get('DASHBOARD_QUERY_ENGINE', 'pandas')
+
+def cube_view(dim):
+    return 'base' if dim in CUBE_DIMENSIONS + ['month'] else dim
+
+def cube_rollup(cube, dims, measures):
+    # The smallest rollup with all of `dims` and `measures`, or None
+    rollups = [rollup for rollup, (keys, sums) in CUBE_ROLLUPS.items()
+               if set(dims) <= set(keys) and set(measures) <= set(sums)]
+    return min(rollups, key=lambda rollup: len(cube[rollup]), default=None)
+
+def row_dimension(dim, rows):
+    # A group-by dimension of the given rows, with the dtype it has in a rollup
+    data = current_data()
+    df = data['frame']
+    if dim == 'day':
+        return data['day_offsets'][rows]
+    if dim in ('date', 'year'):
+        days = df['date'].to_numpy()[rows].astype('datetime64[D]')
+        if dim == 'date':
+            return days.astype(df['date'].dtype)
+        return (days.astype('datetime64[Y]').astype(np.int64) + 1970).astype(np.int16)
+    return pd.Categorical.from_codes(df[dim].cat.codes.to_numpy()[rows], dtype=df[dim].dtype)
+
+def pandas_cube_query(view, start_date, end_date, region, salesperson, channel, by=(), measures=None):
+    data = current_data()
+    df, cube = data['frame'], data['cube']
+    if not cube:
+        # Other engines skip the cube; it is built on the first pandas query (compare-engines)
+        cube.update(load_cube(df, data['base_date'], stored=not data['parts']))
+    measures = list(measures or CUBE_VIEWS[view][1])
+    filters = [(col, value) for col, value in [('region', region), ('salesperson', salesperson),
+                                               ('marketing_channel', channel)] if value != 'All']
+    dims = [col for col, _ in filters] + [dim for dim in by if dim not in TIME_DIMENSIONS]
+    rollup = cube_rollup(cube, dims, measures)
+    if rollup is None:
+        # The filter engine has already applied the filters; only the columns the query reads are gathered
+        rows = filter_rows(start_date, end_date, region, salesperson, channel)
+        part = pd.DataFrame({**{dim: row_dimension(dim, rows) for dim in by},
+                             **{measure: fact_measure(df, measure, rows) for measure in measures}})
+    else:
+        agg = cube[rollup]
+        part = agg.iloc[day_window(agg['day'].to_numpy(), start_date, end_date)]
+        mask = None
+        for col, value in filters:
+            col_mask = (part[col] == value).to_numpy()
+            mask = col_mask if mask is None else mask & col_mask
+        if mask is not None:
+            part = part[mask]
+    if not by:
+        return part[measures].sum()
+    return part.groupby(list(by), observed=True, sort=True)[measures].sum().reset_index()
+
+MEASURE_SQL = {
+    'sales': 'SUM(sales)',
+    'sales_target': 'SUM(sales_target)',
+    'cost': 'SUM(cost)',
+    'converted': 'SUM(CAST(converted AS INTEGER))',
+    'quantity': 'SUM(quantity)',
+    'user_engagement': 'SUM(user_engagement)',
+    'session_duration': 'SUM(session_duration)',
+    'profit_margin': 'SUM(profit_margin)',
+    'engaged': 'SUM(CAST(user_engagement > 5 AS INTEGER))',
+    'rows': 'COUNT(*)',
+}
+DIMENSION_SQL = {
+    'date': "date_trunc('day', date)",
+    'month': "strftime(date, '%Y-%m')",
+    'year': 'CAST(year(date) AS SMALLINT)',
+    'day': "CAST(date_diff('day', CAST(? AS TIMESTAMP), date_trunc('day', date)) AS INTEGER)",
+}
+DUCKDB_CONNECTION = None
+DUCKDB_PID = None
+
+def duckdb_scan(paths, row_numbers=False):
+    # `row_numbers` adds the filename and file_row_number columns, which give rows their stored order
+    files = ', '.join("'" + path.replace("'", "''") + "'" for path in paths)
+    options = ', filename = true, file_row_number = true' if row_numbers else ''
+    return f"read_parquet([{files}], union_by_name = true{options})"
+
+def duckdb_source(parts, row_numbers=False):
+    # The dataset file and the merged parts of a snapshot, so every query reads exactly the rows of its snapshot
+    paths = [dataset_path(num_rows, data_dir=DATA_DIR)] + [os.path.join(parts_dir(), name) for name in sorted(parts)]
+    return duckdb_scan(paths, row_numbers)
+
+def duckdb_connection():
+    global DUCKDB_CONNECTION, DUCKDB_PID
+    if duckdb is None:
+        raise ImportError("DASHBOARD_QUERY_ENGINE=duckdb needs the duckdb package (pip install duckdb)")
+    # A background job is forked from a worker and opens its own connection: connections are not fork-safe
+    if DUCKDB_CONNECTION is None or DUCKDB_PID != os.getpid():
+        DUCKDB_CONNECTION = duckdb.connect()
+        DUCKDB_PID = os.getpid()
+    # One cursor per query: cursors share the database but can run on different request threads
+    return DUCKDB_CONNECTION.cursor()
+
+def duckdb_filters(start_date, end_date, region, salesperson, channel):
+    # WHERE conditions and parameters for the global filters (the end day is included whole)
+    where = ['date >= ?', 'date < ?']
+    params = [pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)]
+    for col, value in [('region', region), ('salesperson', salesperson), ('marketing_channel', channel)]:
+        if value != 'All':
+            where.append(f'"{col}" = ?')
+            params.append(value)
+    return where, params
+
+def duckdb_typed(result, dtypes):
+    # Categorical and date columns of a duckdb result, cast to the dataset's dtypes
+    for col in result.columns:
+        if col == 'date' or isinstance(dtypes.get(col), pd.CategoricalDtype):
+            result[col] = result[col].astype(dtypes[col])
+    return result
+
+def duckdb_cube_query(view, start_date, end_date, region, salesperson, channel, by=(), measures=None):
+    data = current_data()
+    measures = list(measures or CUBE_VIEWS[view][1])
+    by = list(by)
+    dims = [DIMENSION_SQL.get(dim, f'"{dim}"') for dim in by]
+    params = [data['base_date']] * sum(dim == 'day' for dim in by)
+    where, filter_params = duckdb_filters(start_date, end_date, region, salesperson, channel)
+    params += filter_params
+    select = [f'{sql} AS "{dim}"' for dim, sql in zip(by, dims)] + [f'{MEASURE_SQL[m]} AS "{m}"' for m in measures]
+    sql = f"SELECT {', '.join(select)} FROM {duckdb_source(data['parts'])} WHERE {' AND '.join(where)}"
+    if by:
+        sql += f" GROUP BY {', '.join(str(i + 1) for i in range(len(by)))}"
+    result = duckdb_connection().execute(sql, params).df()
+
+    counts = [m for m in measures if m in ('converted', 'quantity', 'user_engagement', 'engaged', 'rows')]
+    result[measures] = result[measures].fillna(0)
+    result[counts] = result[counts].astype(np.int64)
+    result[[m for m in measures if m not in counts]] = result[[m for m in measures if m not in counts]].astype(np.float64)
+    if not by:
+        return result.iloc[0]
+    return duckdb_typed(result, data['dtypes']).sort_values(by, ignore_index=True)
+
+def duckdb_snapshot(paths, data=None):
+    # The frameless snapshot (see "Query engines") of the rows in the Parquet files `paths` added to those of `data`,
+    # read without loading them, and the months those rows fall in
+    first, last, rows, months = duckdb_connection().execute(
+        f"SELECT min(date), max(date), count(*), list(DISTINCT strftime(date, '%Y-%m')) FROM {duckdb_scan(paths)}"
+    ).fetchone()
+    months = sorted(months) if rows else []
+    firsts = [pd.Timestamp(first).normalize()] if rows else []
+    lasts = [pd.Timestamp(last)] if rows else []
+    if data is None:
+        data = {'rows': 0, 'dtypes': {**{col: pd.CategoricalDtype(categories) for col, categories in CATEGORY_COLUMNS.items()},
+                                      'month': pd.CategoricalDtype([], ordered=True),
+                                      'date': pq.read_schema(paths[0]).field('date').type.to_pandas_dtype()}}
+    elif data['rows']:
+        firsts.append(data['base_date'])
+        lasts.append(data['last_date'])
+    known = list(data['dtypes']['month'].categories)
+    return {
+        **data,
+        'base_date': min(firsts, default=data_gen_start_date),
+        'last_date': max(lasts, default=None),
+        'rows': data['rows'] + rows,
+        'dtypes': {**data['dtypes'], 'month': pd.CategoricalDtype(sorted(set(known) | set(months)), ordered=True)},
+    }, months
+
+def duckdb_metadata(path):
+    # frame_metadata() of a dataset file; dropdown options keep the order their values first appear in
+    connection = duckdb_connection()
+    scan = duckdb_scan([path], row_numbers=True)
+    rows, min_date, max_date = connection.execute(f"SELECT count(*), min(date), max(date) FROM {scan}").fetchone()
+    options = {
+        key: [str(value) for value, in connection.execute(
+            f'SELECT "{col}" FROM {scan} GROUP BY 1 ORDER BY min(file_row_number)').fetchall()]
+        for key, col in [('regions', 'region'), ('salespersons', 'salesperson'), ('marketing_channels', 'marketing_channel')]
+    }
+    return {'rows': rows, 'min_date': pd.Timestamp(min_date).isoformat(), 'max_date': pd.Timestamp(max_date).isoformat(),
+            **options}
+
+# Partitioned process pool
+# The rows are date-sorted, so every month is a contiguous row range (a partition). The columns queries read are
+# copied once into shared memory blocks; pool workers attach to them by name and wrap them in numpy arrays, so no rows
+# are ever pickled. A query is split into one task per worker, each covering consecutive partitions of the date window:
+# workers return sums and counts for the group keys they saw (map) and the caller adds them up (reduce). Group keys are
+# the dimension codes combined into one integer, so the per-task work is a handful of np.bincount calls.
+#
+# The pool follows merged rows when a query next needs it. The blocks have POOL_HEADROOM spare rows, and rows only move
+# from the first month a merge touched on (see merge_rows), so those rows are rewritten into the blocks in place and
+# the workers keep running. Everything is copied again, and every worker re-forked, only when that is not possible:
+# rows dated before the first day (which move the date origin), a new category code before existing ones (a
+# backfilled month), or more rows than the blocks hold.
+POOL_WORKERS = int(os.environ.get('DASHBOARD_POOL_WORKERS', os.cpu_count() or 1))
+POOL_DIMENSIONS = ['region', 'salesperson', 'marketing_channel', 'country', 'product', 'promo_event', 'age_group',
+                   'job_title', 'month']
+POOL_MEASURES = ['sales', 'sales_target', 'cost', 'converted', 'quantity', 'user_engagement', 'session_duration',
+                 'profit_margin']
+POOL_COUNT_MEASURES = ['converted', 'quantity', 'user_engagement', 'engaged', 'rows']
+POOL = None
+POOL_PID = None    # the process that started the pool (background jobs forked from it cannot submit to it)
+POOL_REVISION = None  # the revision of the snapshot the pool's columns were copied from
+POOL_LAYOUT = None    # (base date, dimension categories) the pool's day offsets and codes refer to
+POOL_HEADROOM = 0.25  # spare rows in the shared blocks, as a fraction of the rows copied into them
+POOL_LOCK = threading.Lock()  # held while the pool is started or queried (see pool_cube_query)
+POOL_BLOCKS = []   # SharedMemory handles (owned by the main process, attached in workers)
+POOL_COLUMNS = {}  # column name -> numpy array over its shared memory block
+
+def month_partitions(df, days, first_row=0):
+    codes = df['month'].cat.codes.to_numpy()[first_row:]
+    bounds = first_row + np.concatenate([[0], np.flatnonzero(codes[1:] != codes[:-1]) + 1, [len(codes)]])
+    return [(start, stop, int(days[start]), int(days[stop - 1]))
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def pool_columns(data, first_row=0):
+    df = data['frame'].iloc[first_row:]
+    columns = {col: df[col].cat.codes.to_numpy() for col in POOL_DIMENSIONS}
+    columns.update({col: df[col].to_numpy() for col in POOL_MEASURES})
+    columns['day'] = data['day_offsets'][first_row:]
+    columns['year'] = (df['date'].dt.year - data['base_date'].year).to_numpy(dtype=np.int16)
+    return columns
+
+def pool_layout(data):
+    return data['base_date'], {dim: list(data['frame'][dim].cat.categories) for dim in POOL_DIMENSIONS}
+
+def share_columns(columns):
+    specs = {}
+    for name, values in columns.items():
+        capacity = int(len(values) * (1 + POOL_HEADROOM)) + 1
+        block = shared_memory.SharedMemory(create=True, size=capacity * values.dtype.itemsize)
+        shared = np.ndarray((capacity,), dtype=values.dtype, buffer=block.buf)
+        shared[:len(values)] = values
+        POOL_BLOCKS.append(block)
+        POOL_COLUMNS[name] = shared
+        specs[name] = (block.name, values.dtype.str, capacity)
+    return specs
+
+def extend_pool(data):
+    # Rewrites the rows merged since POOL_REVISION into the shared blocks; False when they cannot be written in place
+    global POOL_LAYOUT
+    base_date, categories = POOL_LAYOUT
+    layout = pool_layout(data)
+    if (layout[0] != base_date or len(data['frame']) > len(POOL_COLUMNS['day'])
+            or any(layout[1][dim][:len(codes)] != codes for dim, codes in categories.items())):
+        return False
+    changed = [month for month, revision in data['month_revisions'].items() if revision > POOL_REVISION]
+    first_row = int(np.searchsorted(data['day_offsets'], (pd.Timestamp(min(changed)) - base_date).days)) if changed \
+        else len(data['frame'])
+    columns = pool_columns(data, first_row)
+    if any(values.dtype != POOL_COLUMNS[name].dtype for name, values in columns.items()):
+        return False  # more categories than the codes' integer type holds
+    for name, values in columns.items():
+        POOL_COLUMNS[name][first_row:first_row + len(values)] = values
+    POOL_LAYOUT = layout
+    return True
+
+def attach_columns(specs):
+    POOL_COLUMNS.clear()
+    for name, (block_name, dtype, length) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        POOL_BLOCKS.append(block)
+        POOL_COLUMNS[name] = np.ndarray((length,), dtype=dtype, buffer=block.buf)
+
+def close_pool():
+    global POOL, POOL_REVISION
+    if POOL_PID != os.getpid():
+        return  # a forked background job does not own the pool or its blocks
+    if POOL is not None:
+        POOL.shutdown(cancel_futures=True)
+        POOL = None
+    POOL_REVISION = None
+    POOL_COLUMNS.clear()
+    while POOL_BLOCKS:
+        block = POOL_BLOCKS.pop()
+        block.close()
+        block.unlink()
+
+atexit.register(close_pool)
+
+def start_pool(data):
+    global POOL, POOL_PID, POOL_REVISION, POOL_LAYOUT
+    if POOL is not None and POOL_REVISION != data['revision']:
+        # Rows have been merged since it started
+        if extend_pool(data):
+            POOL_REVISION = data['revision']
+        else:
+            close_pool()
+    if POOL is None:
+        POOL_PID = os.getpid()
+        POOL_REVISION = data['revision']
+        POOL_LAYOUT = pool_layout(data)
+        specs = share_columns(pool_columns(data))
+        # fork: workers start without re-importing this module (which would reload the dataset)
+        POOL = ProcessPoolExecutor(POOL_WORKERS, mp_context=multiprocessing.get_context('fork'),
+                                   initializer=attach_columns, initargs=(specs,))
+    return POOL
+
+def pool_dimension(data, dim, start_day, end_day):
+    # (column, key offset, number of key values) for a group-by dimension
+    if dim in ('date', 'day'):
+        return 'day', start_day, end_day - start_day + 1
+    if dim == 'year':
+        base_date = data['base_date']
+        return 'year', 0, (base_date + pd.Timedelta(days=end_day)).year - base_date.year + 1
+    return dim, 0, len(data['frame'][dim].cat.categories)
+
+def partial_sums(start, stop, start_day, end_day, filters, dims, measures, columns=None):
+    # Map step, run in a pool worker over rows [start, stop) of its shared columns (or of `columns`, in-process)
+    columns = POOL_COLUMNS if columns is None else columns
+    days = columns['day'][start:stop]
+    rows = slice(start + int(np.searchsorted(days, start_day, side='left')),
+                 start + int(np.searchsorted(days, end_day, side='right')))
+    mask = None
+    for col, code in filters:
+        col_mask = columns[col][rows] == code
+        mask = col_mask if mask is None else mask & col_mask
+    keys = np.zeros(rows.stop - rows.start, dtype=np.int64)
+    for col, offset, size in dims:
+        keys = keys * size + (columns[col][rows].astype(np.int64) - offset)
+    if mask is not None:
+        keys = keys[mask]
+    groups, inverse = np.unique(keys, return_inverse=True)
+    sums = {'rows': np.bincount(inverse, minlength=len(groups))}
+    for measure in measures:
+        if measure == 'rows':
+            continue
+        values = columns['user_engagement'][rows] > 5 if measure == 'engaged' else columns[measure][rows]
+        sums[measure] = np.bincount(inverse, weights=values if mask is None else values[mask], minlength=len(groups))
+    return groups, sums
+
+def pool_cube_query(view, start_date, end_date, region, salesperson, channel, by=(), measures=None):
+    data = current_data()
+    df, base_date = data['frame'], data['base_date']
+    measures = list(measures or CUBE_VIEWS[view][1])
+    by = list(by)
+    start_day = (pd.Timestamp(start_date).normalize() - base_date).days
+    end_day = (pd.Timestamp(end_date).normalize() - base_date).days
+    filters = [(col, df[col].cat.categories.get_indexer([value])[0])
+               for col, value in [('region', region), ('salesperson', salesperson), ('marketing_channel', channel)]
+               if value != 'All']
+    dims = [pool_dimension(data, dim, start_day, end_day) for dim in by]
+    parts = [p for p in data['partitions'] if p[3] >= start_day and p[2] <= end_day]
+    chunks = np.array_split(np.arange(len(parts)), min(POOL_WORKERS, len(parts)) or 1)
+    tasks = [(parts[chunk[0]][0], parts[chunk[-1]][1]) for chunk in chunks if len(chunk)]
+    if POOL_PID in (None, os.getpid()) and data is DATA:
+        # Queries take turns (each one already runs on every worker), so the pool never restarts under a running one
+        with POOL_LOCK:
+            pool = start_pool(data)
+            results = [future.result() for future in [pool.submit(partial_sums, start, stop, start_day, end_day,
+                                                                  filters, dims, measures) for start, stop in tasks]]
+    else:
+        # In a background job, or for a request still on an older snapshot than the latest, the map step runs
+        # in-process over the frame's own columns (the shared ones may be rewritten for a newer snapshot meanwhile)
+        columns = pool_columns(data)
+        results = [partial_sums(start, stop, start_day, end_day, filters, dims, measures, columns)
+                   for start, stop in tasks]
+
+    # Reduce step: add up the partial sums of group keys seen by several workers
+    keys = np.concatenate([groups for groups, _ in results]) if results else np.empty(0, dtype=np.int64)
+    groups, inverse = np.unique(keys, return_inverse=True)
+    totals = {}
+    for measure in set(measures) | {'rows'}:
+        values = np.concatenate([sums[measure] for _, sums in results]) if results else np.empty(0)
+        totals[measure] = np.bincount(inverse, weights=values, minlength=len(groups))
+    present = totals['rows'] > 0
+    result = pd.DataFrame({m: totals[m][present].astype(np.int64 if m in POOL_COUNT_MEASURES else np.float64)
+                           for m in measures})
+    if not by:
+        return result.sum() if len(result) else pd.Series(0, index=measures, dtype=np.float64)
+    codes = np.unravel_index(groups[present], [size for _, _, size in dims]) if dims else []
+    columns = {}
+    for dim, (col, offset, _), code in zip(by, dims, codes):
+        if dim == 'date':
+            columns[dim] = (base_date + pd.to_timedelta(code + offset, unit='D')).astype(df['date'].dtype)
+        elif dim == 'day':
+            columns[dim] = (code + offset).astype(np.int32)
+        elif dim == 'year':
+            columns[dim] = (code + base_date.year).astype(np.int16)
+        else:
+            columns[dim] = pd.Categorical.from_codes(code, dtype=df[dim].dtype)
+    return pd.concat([pd.DataFrame(columns), result], axis=1)
+
+QUERY_ENGINES = {
+    'pandas': pandas_cube_query,
+    'duckdb': duckdb_cube_query,
+    'pool': pool_cube_query,
+}
+
+def cube_query(view, start_date, end_date, region, salesperson, channel, by=(), measures=None):
+    return QUERY_ENGINES[QUERY_ENGINE](view, start_date, end_date, region, salesperson, channel, by, measures)
+
+def compare_engines(engines=('pandas', 'duckdb'), filters=None):
+    data = ensure_data()
+    filters = filters or [(data['base_date'], data['last_date'], 'All', 'All', 'All'),
+                          (start_date, start_date + pd.Timedelta(days=180), regions[0], salespersons[0], 'All')]
+    mismatches = 0
+    for view, (dims, _) in CUBE_VIEWS.items():
+        for by in [(), ('date',) + tuple(dims), ('month', 'region') + tuple(dims)]:
+            for filter_args in filters:
+                first, *others = [QUERY_ENGINES[engine](view, *filter_args, by=list(by)) for engine in engines]
+                for engine, other in zip(engines[1:], others):
+                    try:
+                        if by:
+                            pd.testing.assert_frame_equal(first, other, check_dtype=False, rtol=1e-6)
+                        else:
+                            pd.testing.assert_series_equal(first, other, check_dtype=False, check_names=False,
+                                                           rtol=1e-6)
+                    except AssertionError as error:
+                        mismatches += 1
+                        print(f"{view} by {list(by)} {filter_args[2:]}: {engines[0]} != {engine}\n{error}")
+    print(f"Compared {' vs '.join(engines)}: {mismatches} mismatching queries")
+    return mismatches == 0
+
+# Lazy dataset
+# The first caller loads the frame and builds the first snapshot: the date index, bitmaps, partitions and (for the
+# pandas engine) the cube. With the duckdb engine it only reads the date range, row count and months of the files (see
+# "Query engines"). Concurrent callers wait on the lock, which also serializes merges (see apply_new_parts).
+DATA_LOCK = threading.Lock()
+
+def frame_summary(frame):
+    # The snapshot entries every engine reads, also kept by frameless (duckdb) snapshots
+    return {'rows': len(frame), 'last_date': frame['date'].iloc[-1] if len(frame) else None, 'dtypes': dict(frame.dtypes)}
+
+def index_frame(frame, stored=True):
+    # The snapshot entries derived from a date-sorted frame (`stored`: the frame is the stored dataset as is)
+    base_date = frame['date'].iloc[0].normalize() if len(frame) else data_gen_start_date
+    days = day_offsets(frame['date'], base_date)
+    return {
+        **frame_summary(frame),
+        'frame': frame,
+        'base_date': base_date,
+        'day_offsets': days,
+        'bitmaps': build_bitmaps(frame),
+        'partitions': month_partitions(frame, days),
+        'cube': load_cube(frame, base_date, stored) if QUERY_ENGINE == 'pandas' else {},
+    }
+
+def ensure_data():
+    global DATA
+    if DATA is not None:
+        return DATA
+    with DATA_LOCK:
+        if DATA is not None:
+            return DATA
+        started = time.perf_counter()
+        path = dataset_path(num_rows, data_dir=DATA_DIR)
+        metadata = metadata_path(num_rows, data_dir=DATA_DIR)
+        if QUERY_ENGINE == 'duckdb':
+            if not os.path.exists(path):
+                write_metadata(frame_metadata(load_parquet_dataset(num_rows, data_dir=DATA_DIR)), metadata)
+            elif not os.path.exists(metadata):
+                write_metadata(duckdb_metadata(path), metadata)
+            data, _ = duckdb_snapshot([path])
+        else:
+            frame = apply_schema(load_dataset(num_rows, data_dir=DATA_DIR))
+            if not frame['date'].is_monotonic_increasing:
+                frame = frame.sort_values('date', kind='stable', ignore_index=True)
+            if not os.path.exists(metadata):
+                write_metadata(frame_metadata(frame), metadata)
+            data = index_frame(frame)
+        data = {**data, 'revision': 0, 'month_revisions': {}, 'parts': frozenset(), 'parts_digest': ''}
+        parts = pending_parts(data)
+        if parts:
+            data = apply_parts(data, parts)
+        DATA = data
+        if QUERY_ENGINE == 'pool':
+            with POOL_LOCK:
+                start_pool(data)
+        size = f"{memory_mb(data['frame']):.1f} MB in memory" if 'frame' in data else "queried in place by duckdb"
+        print(f"Dataset loaded: {data['rows']:,} rows, {size}, {time.perf_counter() - started:.2f}s")
+    return DATA
+
+# Streaming ingestion
+# `python dashboard.py ingest <events.jsonl|events.csv>` tails an append-only event file. Every INGEST_POLL_SECONDS it
+# parses the complete lines added since the saved offset, in micro-batches of up to INGEST_BATCH_ROWS, derives the
+# dashboard columns and writes each batch as a Parquet part next to the dataset. The offset is saved after each part,
+# so a restart resumes where it stopped. Events need the columns generate_weblog() produces; rows with unparseable
+# values or unknown categories are dropped.
+#
+# App processes pick up new parts with apply_new_parts(), which a watcher thread runs every INGEST_POLL_SECONDS (Live
+# mode only has to keep ticking), and merge them in without a rebuild (see merge_rows): rows dated on or after the
+# current last row are appended, extending the date index, the bitmaps, the last month partition and the tail of each
+# cube view.
+INGEST_COLUMNS = ['date', 'country', 'region', 'product', 'job_title', 'sales', 'user_engagement', 'promo_event',
+                  'converted', 'salesperson', 'marketing_channel', 'sales_target', 'unit_price']
+INGEST_NUMERIC_COLUMNS = ['sales', 'user_engagement', 'converted', 'sales_target', 'unit_price']
+INGEST_BATCH_ROWS = 5000
+INGEST_POLL_SECONDS = float(os.environ.get('DASHBOARD_INGEST_POLL_SECONDS', '2'))
+# Only empty fields are missing: pandas would otherwise read the promo_event value 'None' as NaN
+CSV_OPTIONS = {'keep_default_na': False, 'na_values': ['']}
+PART_WATCHER_PID = None  # the process whose watcher thread merges new parts (see start_part_watcher)
+
+def parts_dir():
+    return dataset_path(num_rows, data_dir=DATA_DIR).replace('.parquet', '-parts')
+
+def write_json(data, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def read_new_lines(path, offset, max_lines):
+    # Only complete lines: a trailing line without its newline is still being written
+    lines = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while len(lines) < max_lines:
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                break
+            lines.append(line.decode('utf-8'))
+            offset += len(line)
+    return lines, offset
+
+def parse_events(lines, header=None):
+    if header is not None:
+        frame = pd.read_csv(StringIO(header + ''.join(lines)), **CSV_OPTIONS)
+    else:
+        frame = pd.DataFrame([json.loads(line) for line in lines if line.strip()])
+    return validate_events(frame)
+
+def validate_events(frame):
+    missing = [col for col in INGEST_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Events are missing columns: {', '.join(missing)}")
+    frame = frame[INGEST_COLUMNS].copy()
+    frame['date'] = pd.to_datetime(frame['date'], errors='coerce')
+    for col in INGEST_NUMERIC_COLUMNS:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce')
+    valid = frame[['date'] + INGEST_NUMERIC_COLUMNS].notna().all(axis=1)
+    for col, categories in CATEGORY_COLUMNS.items():
+        if col in frame.columns:
+            valid &= frame[col].isin(categories)
+    if not valid.all():
+        print(f"Dropped {(~valid).sum():,} of {len(frame):,} events with missing or unknown values")
+    return frame[valid].reset_index(drop=True)
+
+def ingest_batch(source, seed=42):
+    # One micro-batch: parse the next lines of `source` into a Parquet part; returns the number of rows written
+    directory = parts_dir()
+    os.makedirs(directory, exist_ok=True)
+    state_path = os.path.join(directory, 'ingest.json')
+    state = {'source': os.path.abspath(source), 'offset': 0, 'header': None, 'next_part': 0}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state.update(json.load(f))
+    if state['source'] != os.path.abspath(source):
+        raise ValueError(f"{directory} is already fed from {state['source']}")
+    if source.endswith('.csv') and state['header'] is None:
+        header, offset = read_new_lines(source, 0, 1)
+        if not header:
+            return 0
+        state.update(header=header[0], offset=offset)
+    lines, offset = read_new_lines(source, state['offset'], INGEST_BATCH_ROWS)
+    if not lines:
+        return 0
+    batch = parse_events(lines, state['header'])
+    if len(batch):
+        batch = apply_schema(prepare_dataset(batch, seed + state['next_part'] + 1))
+        part_path = os.path.join(directory, f"part-{state['next_part']:06d}.parquet")
+        batch.sort_values('date', kind='stable', ignore_index=True).to_parquet(f'{part_path}.tmp', index=False)
+        os.replace(f'{part_path}.tmp', part_path)
+        state['next_part'] += 1
+    state['offset'] = offset
+    write_json(state, state_path)
+    return len(batch)
+
+def run_ingest(source):
+    configure()
+    print(f"Tailing {source} into {parts_dir()}")
+    while True:
+        rows = ingest_batch(source)
+        if rows:
+            print(f"Ingested {rows:,} rows")
+        else:
+            time.sleep(INGEST_POLL_SECONDS)
+
+def pending_parts(data):
+    # Ingested (part-*) and uploaded (upload-*) parts not merged into `data` yet; staging directories, temporary files
+    # and import records are skipped
+    directory = parts_dir()
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in sorted(os.listdir(directory))
+            if name.startswith(('part-', 'upload-')) and name.endswith('.parquet') and name not in data['parts']]
+
+def apply_new_parts():
+    # Merges new parts into the next snapshot and publishes it; returns the number of parts merged. The merge itself
+    # runs beside the current snapshot, which readers keep using until the single assignment to DATA.
+    global DATA
+    if not pending_parts(ensure_data()):
+        return 0
+    with DATA_LOCK:
+        parts = pending_parts(DATA)
+        if parts:
+            DATA = apply_parts(DATA, parts)
+    return len(parts)
+
+def apply_parts(data, names):
+    # The snapshot with the parts `names` merged into `data`; the pool catches up with it on its next query, and duckdb
+    # queries read the parts listed in it
+    paths = [os.path.join(parts_dir(), name) for name in names]
+    if 'frame' in data:
+        merged, months = merge_rows(data, pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True))
+    else:
+        merged, months = duckdb_snapshot(paths, data)
+    revision = data['revision'] + 1
+    parts = data['parts'] | frozenset(names)
+    merged.update(revision=revision, month_revisions={**data['month_revisions'], **dict.fromkeys(months, revision)},
+                  parts=parts, parts_digest=hashlib.sha1('\n'.join(sorted(parts)).encode()).hexdigest()[:12])
+    print(f"Applied {len(names)} part(s): {merged['rows'] - data['rows']:,} rows in {len(months)} month(s), "
+          f"{merged['rows']:,} in total")
+    return merged
+
+def watch_parts():
+    while True:
+        time.sleep(INGEST_POLL_SECONDS)
+        try:
+            apply_new_parts()
+        except Exception as error:  # keep watching: the next parts may merge fine
+            print(f"Merging new parts failed: {error}")
+
+def start_part_watcher():
+    # One watcher thread per process; a worker forked from a process that runs one does not inherit the thread
+    global PART_WATCHER_PID
+    if PART_WATCHER_PID == os.getpid():
+        return
+    with DATA_LOCK:
+        if PART_WATCHER_PID != os.getpid():
+            PART_WATCHER_PID = os.getpid()
+            threading.Thread(target=watch_parts, daemon=True).start()
+
+def align_months(frame, months):
+    return frame.assign(month=pd.Categorical(frame['month'].astype(str), categories=months, ordered=True))
+
+# Merging rows
+# New rows are placed after the existing rows of the same date, so every row before the first of them keeps its
+# position: the date index and the bitmaps are rebuilt from that row on, the month partitions from the partition that
+# holds it, and each cube view re-aggregates only the days the new rows fall on. Appending in date order (streaming)
+# therefore only touches the tail; a backfill of an older month re-indexes the rows after it but still re-aggregates
+# that month alone. Rows dated before the first day move the origin of the date index, so they trigger a full rebuild.
+# Nothing in `data` is modified: the unchanged heads of its arrays are copied into new ones. Returns the merged
+# snapshot (apply_parts adds its versions) and the months whose rows changed.
+def merge_rows(data, batch):
+    df = data['frame']
+    if len(batch) == 0:
+        return dict(data), []
+    months = sorted(set(df['month'].cat.categories) | set(batch['month'].astype(str)))
+    batch = align_months(apply_schema(batch), months).sort_values('date', kind='stable', ignore_index=True)
+    batch['date'] = batch['date'].astype(df['date'].dtype)
+    current = df if list(df['month'].cat.categories) == months else align_months(df, months)
+    batch = batch[current.columns]
+    base_date = data['base_date']
+    if len(current) == 0 or batch['date'].iloc[0] < base_date:
+        frame = pd.concat([current, batch], ignore_index=True).sort_values('date', kind='stable', ignore_index=True)
+        return {**data, **index_frame(frame, stored=False)}, months
+
+    first_row = int(current['date'].searchsorted(batch['date'].iloc[0], side='right'))
+    tail = pd.concat([current.iloc[first_row:], batch], ignore_index=True).sort_values('date', kind='stable')
+    frame = pd.concat([current.iloc[:first_row], tail], ignore_index=True)
+    days = np.concatenate([data['day_offsets'][:first_row], day_offsets(tail['date'], base_date)])
+    partitions = data['partitions']
+    part = max(int(np.searchsorted([start for start, *_ in partitions], first_row, side='right')) - 1, 0)
+    cube = {}
+    if data['cube']:
+        for rollup, delta in build_cube(batch, base_date).items():
+            cube[rollup] = merge_cube_view(rollup, align_months(data['cube'][rollup], months), delta)
+    merged = {
+        **data,
+        **frame_summary(frame),
+        'frame': frame,
+        'day_offsets': days,
+        'bitmaps': repack_bitmaps(data['bitmaps'], first_row, frame.iloc[first_row:]),
+        'partitions': partitions[:part] + month_partitions(frame, days, partitions[part][0] if partitions else 0),
+        'cube': cube,
+    }
+    return merged, sorted(set(batch['month'].astype(str)))
+
+def repack_bitmaps(bitmaps, first_row, rows):
+    # The byte holding first_row may be partly used: unpack those bits and repack them together with the new rows
+    used = first_row % 8
+    kept = first_row // 8
+    repacked = {}
+    for col in BITMAP_COLUMNS:
+        codes = rows[col].cat.codes.to_numpy()
+        repacked[col] = {}
+        for code, value in enumerate(rows[col].cat.categories):
+            bitmap = bitmaps[col][value]
+            head = np.unpackbits(bitmap[kept:kept + 1])[:used] if used else np.empty(0, dtype=np.uint8)
+            repacked[col][value] = np.concatenate([bitmap[:kept], np.packbits(np.concatenate([head, codes == code]))])
+    return repacked
+
+def merge_cube_view(rollup, agg, delta):
+    # Per month of the delta (a build_cube() of the new rows, so already at daily grain), the rollup's rows from its
+    # first to its last day are re-aggregated together with it; the rollup is sorted by date, so those rows are one
+    # contiguous range and every other row is reused as is
+    dims = ['date'] + CUBE_ROLLUPS[rollup][0]
+    measures = CUBE_ROLLUPS[rollup][1]
+    counts = [col for col in measures if pd.api.types.is_integer_dtype(agg[col])]
+    days = agg['day'].to_numpy()
+    pieces = []
+    kept = 0
+    for _, month in delta.groupby('month', observed=True, sort=True):
+        start = int(np.searchsorted(days, month['day'].iloc[0]))
+        stop = int(np.searchsorted(days, month['day'].iloc[-1], side='right'))
+        merged = pd.concat([agg.iloc[start:stop], month[agg.columns]], ignore_index=True)
+        merged = merged.groupby(dims + ['month', 'day', 'year'], observed=True, sort=True)[measures].sum().reset_index()
+        merged[counts] = merged[counts].astype(np.int32)
+        pieces += [agg.iloc[kept:start], merged[agg.columns]]
+        kept = stop
+    pieces.append(agg.iloc[kept:])
+    return pd.concat(pieces, ignore_index=True)
+
+# Bulk upload
+# CSV and Parquet exports (with the same columns as ingested events) are imported in bounded memory: the upload is
+# decoded to a temporary file UPLOAD_DECODE_CHARS base64 characters at a time, then read back UPLOAD_CHUNK_ROWS rows at a
+# time (CSV chunks, Parquet record batches), validated and written as Parquet parts into a staging directory. The parts
+# are moved next to the ingested ones only once the whole file has been read, so a file that fails validation merges
+# nothing. A file whose contents were imported before is rejected, since its rows are in the dataset already. The
+# importing process merges the parts as soon as they are in place; the other app processes within INGEST_POLL_SECONDS
+# (see watch_parts).
+#
+# Imports run on a background thread, so the upload request returns at once and other callbacks keep being served;
+# progress is kept in a status file any worker can read. dcc.Upload still sends the file base64-encoded in a single
+# request that the worker holds in memory, so the browser refuses files over UPLOAD_MAX_MB: larger exports are imported
+# with `python dashboard.py import <file>`, which reads from disk.
+UPLOAD_MAX_MB = float(os.environ.get('DASHBOARD_UPLOAD_MAX_MB', '100'))
+UPLOAD_CHUNK_ROWS = 100000
+UPLOAD_DECODE_CHARS = 4 * 1024 * 1024  # a multiple of 4: base64 decodes in groups of 4 characters
+UPLOAD_POLL_MS = 1000
+UPLOAD_FORMATS = ('.csv', '.parquet')
+
+def upload_status_path():
+    return os.path.join(parts_dir(), 'upload.json')
+
+def read_upload_status():
+    path = upload_status_path()
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def decode_upload(contents, path):
+    # `contents` is the data URL dcc.Upload sends: "data:<type>;base64,<payload>"; the payload is decoded in place,
+    # without a copy of it
+    with open(path, 'wb') as f:
+        for start in range(contents.index(',') + 1, len(contents), UPLOAD_DECODE_CHARS):
+            f.write(base64.b64decode(contents[start:start + UPLOAD_DECODE_CHARS]))
+
+def read_chunks(path):
+    if path.endswith('.parquet'):
+        parquet = pq.ParquetFile(path)
+        missing = [col for col in INGEST_COLUMNS if col not in parquet.schema_arrow.names]
+        if missing:
+            raise ValueError(f"The file is missing columns: {', '.join(missing)}")
+        for batch in parquet.iter_batches(batch_size=UPLOAD_CHUNK_ROWS, columns=INGEST_COLUMNS):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=UPLOAD_CHUNK_ROWS, usecols=lambda col: col in INGEST_COLUMNS, **CSV_OPTIONS)
+
+def upload_status(filename, **changes):
+    # state is 'running', 'done' or 'failed'; rows counts the valid rows read so far
+    return {'file': filename, 'state': 'running', 'rows': 0, 'dropped': 0, 'error': None, **changes}
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(UPLOAD_DECODE_CHARS), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def import_file(path, filename=None, seed=42, merge=False):
+    # Returns the final upload_status(); with `merge`, the import is only done once its rows are merged in this process
+    directory = parts_dir()
+    os.makedirs(directory, exist_ok=True)
+    import_id = f'{time.time_ns()}-{os.getpid()}'
+    status = upload_status(filename or os.path.basename(path))
+    # One record per imported file contents, created exclusively: of two imports of the same file, even in different
+    # processes at the same time, the second is rejected
+    record = os.path.join(directory, f'import-{file_digest(path)}.json')
+    try:
+        with open(record, 'x') as f:
+            json.dump({'file': status['file'], 'import_id': import_id}, f)
+    except FileExistsError:
+        status.update(state='failed', error="the same file has already been imported")
+        write_json(status, upload_status_path())
+        return status
+    staging = os.path.join(directory, f'.upload-{import_id}')
+    os.makedirs(staging)
+    try:
+        for number, chunk in enumerate(read_chunks(path)):
+            batch = validate_events(chunk)
+            status['dropped'] += len(chunk) - len(batch)
+            if len(batch):
+                batch = apply_schema(prepare_dataset(batch, seed + number + 1))
+                part_path = os.path.join(staging, f'upload-{import_id}-{number:06d}.parquet')
+                batch.sort_values('date', kind='stable', ignore_index=True).to_parquet(part_path, index=False)
+                status['rows'] += len(batch)
+            write_json(status, upload_status_path())
+        for part in sorted(os.listdir(staging)):
+            os.replace(os.path.join(staging, part), os.path.join(directory, part))
+        status['state'] = 'done'
+    except (ValueError, OSError) as error:
+        status.update(state='failed', error=str(error))
+        os.remove(record)  # nothing was imported
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    if merge and status['state'] == 'done':
+        try:
+            apply_new_parts()
+        except Exception as error:  # the parts stay in place, so the part watchers retry them
+            status.update(state='failed', error=f"the rows could not be merged: {error}")
+    write_json(status, upload_status_path())
+    return status
+
+def start_upload(contents, filename):
+    directory = parts_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'.upload-{time.time_ns()}{os.path.splitext(filename)[1].lower()}')
+    # Written before the thread starts, so the first status poll never sees the previous import's result
+    write_json(upload_status(filename), upload_status_path())
+
+    def run():
+        try:
+            decode_upload(contents, path)
+            import_file(path, filename, merge=True)
+        except Exception as error:  # not base64, the disk is full, or anything unexpected: the status must say so
+            write_json(upload_status(filename, state='failed', error=str(error)), upload_status_path())
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def upload_message(status):
+    if status['state'] == 'failed':
+        return f"Import of {status['file']} failed: {status['error']}"
+    dropped = f" ({status['dropped']:,} invalid rows skipped)" if status['dropped'] else ""
+    if status['state'] == 'done':
+        return f"Imported {status['rows']:,} rows from {status['file']}{dropped}"
+    return f"Importing {status['file']}: {status['rows']:,} rows read{dropped}"
+
+LIVE_INTERVAL_MS = 5000
+
+def latest_end_date(end_date):
+    # Live mode: keep the end of the range open so rows newer than the date picker's bound are included
+    last_date = current_data()['last_date']
+    return max(pd.Timestamp(end_date), last_date).isoformat() if last_date is not None else end_date
+
+# Year-over-year growth
+# Takes one row per day with data (columns `year` and `sales`, as returned by grouping the cube by date and year).
+# Each year's sales are annualized by the share of its calendar days that have data, so partial first and last years
+# compare fairly with full ones. Returns the growth of the last year over the one before it, in percent.
+def annualized_growth(daily):
+    by_year = daily.groupby('year')['sales'].agg(['sum', 'size'])
+    if len(by_year) < 2:
+        return 0.0
+    years = by_year.index.to_numpy()
+    days_in_year = np.where((years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0)), 366, 365)
+    annualized = by_year['sum'].to_numpy() * days_in_year / by_year['size'].to_numpy()
+    if annualized[-2] == 0:
+        return 0.0
+    return (annualized[-1] / annualized[-2] - 1) * 100
+
+# Box-plot statistics
+# Box plots are drawn from quartiles and whisker fences computed on the server (Tukey fences at 1.5 IQR, the same
+# rule Plotly applies) plus an evenly spaced sample of at most MAX_BOX_OUTLIERS outliers per box, so the figure stays
+# a few KB whatever the number of rows behind it.
+MAX_BOX_OUTLIERS = 50
+
+def box_stats(values, codes, labels, max_outliers=MAX_BOX_OUTLIERS):
+    order = np.lexsort((values, codes))
+    values, codes = values[order], codes[order]
+    bounds = np.searchsorted(codes, np.arange(len(labels) + 1))
+    stats = []
+    for code, label in enumerate(labels):
+        group = values[bounds[code]:bounds[code + 1]]
+        if len(group) == 0:
+            continue
+        q1, median, q3 = np.quantile(group, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        inside = group[(group >= q1 - 1.5 * iqr) & (group <= q3 + 1.5 * iqr)]
+        outliers = group[(group < inside[0]) | (group > inside[-1])]
+        if len(outliers) > max_outliers:
+            outliers = outliers[np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int)]
+        stats.append({'group': label, 'q1': q1, 'median': median, 'q3': q3, 'lowerfence': inside[0],
+                      'upperfence': inside[-1], 'count': len(group), 'outliers': outliers})
+    return stats
+
+def duckdb_box_stats(filters, max_outliers=MAX_BOX_OUTLIERS):
+    # box_stats() of the converted sales per promotion, computed by duckdb: quartiles with quantile_cont (numpy's default
+    # linear interpolation) and the same evenly spaced sample of each group's sorted outliers
+    data = current_data()
+    where, params = duckdb_filters(*filters)
+    sample = f'CAST(round_even(k * ((m - 1) / {max_outliers - 1}), 0) AS BIGINT)'
+    sql = f"""
+        WITH sales AS MATERIALIZED (
+            SELECT CAST(promo_event AS VARCHAR) AS grp, CAST(sales AS DOUBLE) AS value
+            FROM {duckdb_source(data['parts'])} WHERE {' AND '.join(where)} AND sales > 0
+        ), quartiles AS (
+            SELECT grp, quantile_cont(value, [0.25, 0.5, 0.75]) AS q, count(*) AS n FROM sales GROUP BY grp
+        ), fences AS (
+            SELECT grp, any_value(q) AS q, any_value(n) AS n,
+                   min(value) FILTER (WHERE value >= q[1] - 1.5 * (q[3] - q[1])) AS lower,
+                   max(value) FILTER (WHERE value <= q[3] + 1.5 * (q[3] - q[1])) AS upper
+            FROM sales JOIN quartiles USING (grp) GROUP BY grp
+        ), outliers AS (
+            SELECT grp, value, row_number() OVER (PARTITION BY grp ORDER BY value) - 1 AS i,
+                   count(*) OVER (PARTITION BY grp) AS m
+            FROM sales JOIN fences USING (grp) WHERE value < lower OR value > upper
+        ), sampled AS (
+            SELECT grp, list(value ORDER BY value) AS values FROM outliers
+            WHERE m <= {max_outliers} OR list_contains(list_transform(range({max_outliers}), k -> {sample}), i)
+            GROUP BY grp
+        )
+        SELECT grp, q, n, lower, upper, values FROM fences LEFT JOIN sampled USING (grp)"""
+    groups = {row[0]: row[1:] for row in duckdb_connection().execute(sql, params).fetchall()}
+    stats = []
+    for label in data['dtypes']['promo_event'].categories:
+        if label in groups:
+            (q1, median, q3), count, lower, upper, outliers = groups[label]
+            stats.append({'group': label, 'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lower, 'upperfence': upper,
+                          'count': count, 'outliers': np.array(outliers or [], dtype=np.float64)})
+    return stats
+
+def box_figure(stats, title):
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, box in enumerate(stats):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            name=box['group'], x=[box['group']], q1=[box['q1']], median=[box['median']], q3=[box['q3']],
+            lowerfence=[box['lowerfence']], upperfence=[box['upperfence']], boxpoints=False, marker_color=color
+        ))
+        if len(box['outliers']):
+            fig.add_trace(go.Scatter(
+                x=[box['group']] * len(box['outliers']), y=box['outliers'], mode='markers', name=box['group'],
+                marker=dict(color=color, size=4), hoverinfo='y'
+            ))
+    fig.update_layout(title=title)
+    return fig
+
+# Pre-binned charts
+# px.histogram and px.density_heatmap embed every input row in the figure and bin in the browser. These helpers take
+# bins that were already summed on the server (typically a cube_query grouped by the bin dimensions) and emit one
+# compact trace per series, so the figure size depends on the number of bins only.
+def binned_bar(agg, x, y, color=None, title=None, barmode='group'):
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    series = agg.groupby(color, observed=True, sort=True) if color else [(y, agg)]
+    for i, (name, part) in enumerate(series):
+        fig.add_trace(go.Bar(x=part[x].astype(str), y=part[y], name=str(name), marker_color=colors[i % len(colors)]))
+    fig.update_layout(title=title, barmode=barmode, xaxis_title=x, yaxis_title=f"sum of {y}", legend_title_text=color,
+                      showlegend=color is not None)
+    return fig
+
+def binned_heatmap(agg, x, y, z, title=None):
+    grid = agg.pivot_table(index=y, columns=x, values=z, aggfunc='sum', observed=True, sort=True)
+    fig = go.Figure(go.Heatmap(x=grid.columns.astype(str), y=grid.index.astype(str), z=grid.to_numpy(),
+                               coloraxis='coloraxis', hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<br>sum of {z}=%{{z}}<extra></extra>"))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, coloraxis_colorbar_title_text=f"sum of {z}")
+    return fig
+
+# Trend downsampling
+# Line charts are reduced with Largest-Triangle-Three-Buckets, which keeps the visual shape (peaks, dips, trend) of a
+# series while capping its points. The cap is the chart's width in pixels times TREND_POINTS_PER_PIXEL; the browser
+# reports its viewport width and each chart knows how many grid columns it shares the row with. The "Exact trends"
+# toggle turns downsampling off.
+TREND_POINTS_PER_PIXEL = 1
+MIN_TREND_POINTS = 100
+DEFAULT_VIEWPORT_WIDTH = 1280
+
+def trend_budget(viewport_width, columns, exact_mode):
+    if exact_mode and 'exact' in exact_mode:
+        return None
+    width = viewport_width or DEFAULT_VIEWPORT_WIDTH
+    return max(MIN_TREND_POINTS, int(width / columns * TREND_POINTS_PER_PIXEL))
+
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsample(frame, x, y, budget, color=None):
+    if budget is None:
+        return frame
+    parts = frame.groupby(color, observed=True, sort=False) if color else [(None, frame)]
+    keep = []
+    for _, part in parts:
+        xs = part[x].to_numpy()
+        if np.issubdtype(xs.dtype, np.datetime64):
+            xs = xs.astype('datetime64[ns]').astype(np.int64)
+        keep.append(part.index.to_numpy()[lttb(xs, part[y].to_numpy(), budget)])
+    return frame.loc[np.sort(np.concatenate(keep))] if keep else frame
+
+# Typed date arrays
+# Plotly already sends numeric numpy arrays as base64 typed arrays, but datetimes go out as ISO strings (~21 bytes per
+# point). Trend x values are sent as epoch milliseconds (float64 typed arrays) on axes marked type='date' instead.
+def epoch_ms(values):
+    return np.asarray(values, dtype='datetime64[ms]').astype(np.float64)
+
+def typed_dates(fig):
+    converted = False
+    for trace in fig.data:
+        values = getattr(trace, 'x', None)
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'M':
+            trace.x = epoch_ms(values)
+            converted = True
+    if converted:
+        fig.update_xaxes(type='date')
+    return fig
+
+# Result cache
+# Callback results and the aggregated frames behind the trend charts are pickled into a SQLite key-value store under
+# DATA_DIR, so every worker shares them and they survive restarts and deploys. A key hashes the function name, its
+# arguments (midnight timestamps shortened to dates, trigger-only arguments left out) and the content versions the
+# result depends on: data_version() and, for the promotions tab, the registry revision. Entries for older data are
+# never matched again and age out: the store is kept under RESULT_CACHE_MB by evicting the least recently used entries
+# first. Hits, misses, writes and evictions are counted per process (result_cache_stats()).
+RESULT_CACHE_MB = float(os.environ.get('DASHBOARD_RESULT_CACHE_MB', '256'))  # 0 turns the cache off
+RESULT_TOUCH_SECONDS = 60  # last-use times are refreshed at most this often, so most hits do not write
+TRIGGER_ARGUMENTS = {'rendered', 'n_intervals', 'registry', 'request'}
+RESULT_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_use ON results (used);
+"""
+MIDNIGHT_TIMESTAMP = re.compile(r'(\d{4}-\d{2}-\d{2})(T00:00:00(\.0+)?)?')
+RESULT_CACHE_STATS = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+RESULT_CACHE_LOCK = threading.Lock()
+RESULT_CACHE_LOCAL = threading.local()
+
+def result_cache_path():
+    return os.path.join(DATA_DIR, 'results.sqlite')
+
+def result_cache_connection():
+    # One connection per thread; connections must not cross a fork, and configure() may point DATA_DIR elsewhere
+    key = (os.getpid(), result_cache_path())
+    if getattr(RESULT_CACHE_LOCAL, 'key', None) != key:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        connection = sqlite3.connect(key[1], timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(RESULT_CACHE_SCHEMA)
+        RESULT_CACHE_LOCAL.key, RESULT_CACHE_LOCAL.connection = key, connection
+    return RESULT_CACHE_LOCAL.connection
+
+def count_result(stat, n=1):
+    with RESULT_CACHE_LOCK:
+        RESULT_CACHE_STATS[stat] += n
+
+def normalize_argument(value):
+    if isinstance(value, str):
+        match = MIDNIGHT_TIMESTAMP.fullmatch(value)
+        return match.group(1) if match else value
+    if isinstance(value, (list, tuple)):
+        return [normalize_argument(item) for item in value]
+    return value
+
+def result_key(name, arguments, versions):
+    payload = [name, normalize_argument(list(arguments)), [version() for version in versions]]
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def cache_get(key):
+    connection = result_cache_connection()
+    row = connection.execute('SELECT value, used FROM results WHERE key = ?', (key,)).fetchone()
+    if row is None:
+        count_result('misses')
+        return None
+    if time.time() - row[1] > RESULT_TOUCH_SECONDS:
+        connection.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+    count_result('hits')
+    return pickle.loads(row[0])
+
+def cache_put(key, value):
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    connection = result_cache_connection()
+    connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, blob, len(blob), time.time()))
+    count_result('writes')
+    evict_results(connection)
+
+def evict_results(connection):
+    # Over the limit: drop least recently used entries until the store is back to 90% of it
+    limit = RESULT_CACHE_MB * 2**20
+    total = connection.execute('SELECT coalesce(sum(size), 0) FROM results').fetchone()[0]
+    if total <= limit:
+        return
+    evicted = 0
+    connection.execute('BEGIN IMMEDIATE')
+    for key, size in connection.execute('SELECT key, size FROM results ORDER BY used').fetchall():
+        if total <= limit * 0.9:
+            break
+        connection.execute('DELETE FROM results WHERE key = ?', (key,))
+        total -= size
+        evicted += 1
+    connection.execute('COMMIT')
+    count_result('evictions', evicted)
+
+def result_cache_stats():
+    entries, size = result_cache_connection().execute('SELECT count(*), coalesce(sum(size), 0) FROM results').fetchone()
+    with RESULT_CACHE_LOCK:
+        stats = dict(RESULT_CACHE_STATS)
+    lookups = stats['hits'] + stats['misses']
+    return {**stats, 'hit_rate': stats['hits'] / lookups if lookups else 0.0, 'entries': entries, 'mb': size / 2**20}
+
+def result_cached(versions=(data_version,)):
+    # For functions whose result depends only on their (JSON-serializable) arguments and the versions
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args):
+            if RESULT_CACHE_MB <= 0:
+                return function(*args)
+            key = result_key(function.__name__, args, versions)
+            value = cache_get(key)
+            if value is None:
+                value = function(*args)
+                cache_put(key, value)
+            return value
+        return wrapper
+    return decorate
+
+def cached_tab(tab, versions=(data_version,)):
+    # For tab callbacks (see skip_tab_update; the last output is the rendered inputs): only the visible tab looks up
+    # the cache, and a cached result the tab already shows is skipped the same way
+    def decorate(callback):
+        signature = inspect.signature(callback)
+
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            values = signature.bind(*args, **kwargs).arguments
+            if values['active_tab'] != tab or RESULT_CACHE_MB <= 0:
+                return callback(*args, **kwargs)
+            arguments = [(name, value) for name, value in values.items() if name not in TRIGGER_ARGUMENTS]
+            key = result_key(callback.__name__, arguments, versions)
+            outputs = cache_get(key)
+            if outputs is None:
+                # Figures are kept as the plain dicts they serialize to: unpickling a go.Figure re-validates it
+                outputs = tuple(output.to_plotly_json() if isinstance(output, go.Figure) else output
+                                for output in callback(*args, **kwargs))
+                cache_put(key, outputs)
+            else:
+                skip_tab_update(tab, values['active_tab'], values['rendered'], outputs[-1])
+            return outputs
+        return wrapper
+    return decorate
+
+# Zoomable trends
+# Trend charts start coarse and re-aggregate on zoom: the visible x-range is re-queried at the finest granularity whose
+# bucket count fits the chart's point budget (month -> week -> day -> hour) and only the traces are patched. Days come
+# from the cube; hours need raw timestamps, so they are only offered for spans of up to HOURLY_SPAN_DAYS.
+TREND_GRANULARITIES = {'month': 'M', 'week': 'W', 'day': 'D', 'hour': 'h'}
+TREND_BUCKET_DAYS = {'month': 30.4, 'week': 7, 'day': 1, 'hour': 1 / 24}
+HOURLY_SPAN_DAYS = 7
+
+def zoomed_range(relayout, rendered, inputs):
+    # Keep the previous zoom while the other inputs are unchanged; double-click (autorange) resets it
+    previous = rendered[-1] if rendered and rendered[:-1] == inputs else None
+    if not relayout or relayout.get('xaxis.autorange'):
+        return None if relayout else previous
+    if 'xaxis.range[0]' in relayout:
+        return [relayout['xaxis.range[0]'], relayout['xaxis.range[1]']]
+    if 'xaxis.range' in relayout:
+        return list(relayout['xaxis.range'])
+    return previous
+
+def trend_granularity(start, end, budget):
+    span_days = max((end - start) / pd.Timedelta(days=1), 1)
+    if budget is None:
+        return 'hour' if span_days <= HOURLY_SPAN_DAYS else 'day'
+    fitting = [name for name, days in TREND_BUCKET_DAYS.items()
+               if span_days / days <= budget and (name != 'hour' or span_days <= HOURLY_SPAN_DAYS)]
+    return fitting[-1] if fitting else 'month'
+
+@result_cached()
+def trend_series(filters, x_range, by, budget):
+    # A zoom or pan only narrows the filter's date window (whose end day is included whole)
+    start = pd.Timestamp(filters[0]).normalize()
+    end = pd.Timestamp(filters[1]).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    if x_range:
+        start, end = max(start, pd.Timestamp(x_range[0])), min(end, pd.Timestamp(x_range[1]))
+    granularity = trend_granularity(start, end, budget)
+    if start > end:
+        return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), **{col: pd.Series(dtype=object) for col in by},
+                             'sales': pd.Series(dtype=np.float64)}), granularity
+    query_filters = (start, end) + tuple(filters[2:])
+    if granularity == 'hour' and QUERY_ENGINE == 'duckdb':
+        part = duckdb_hourly_sales(query_filters, start, end, by)
+        buckets = part['date']
+    elif granularity == 'hour':
+        part = current_data()['frame'][['date', 'sales'] + by].take(filter_rows(*query_filters))
+        part = part[(part['date'] >= start) & (part['date'] <= end)]
+        buckets = part['date'].dt.floor('h')
+    else:
+        part = cube_query('base', *query_filters, by=['date'] + by, measures=['sales'])
+        buckets = part['date'] if granularity == 'day' else part['date'].dt.to_period(TREND_GRANULARITIES[granularity]).dt.start_time
+    series = part.assign(date=buckets).groupby(['date'] + by, observed=True, sort=True)['sales'].sum().reset_index()
+    return series, granularity
+
+def duckdb_hourly_sales(filters, start, end, by):
+    data = current_data()
+    where, params = duckdb_filters(*filters)
+    select = ["date_trunc('hour', date) AS date"] + [f'"{col}"' for col in by] + ['SUM(sales) AS sales']
+    keys = ', '.join(str(i + 1) for i in range(len(by) + 1))
+    sql = (f"SELECT {', '.join(select)} FROM {duckdb_source(data['parts'])} "
+           f"WHERE {' AND '.join(where + ['date >= ?', 'date <= ?'])} GROUP BY {keys} ORDER BY {keys}")
+    return duckdb_typed(duckdb_connection().execute(sql, params + [start, end]).df(), data['dtypes'])
+
+def trend_traces(series, color, names):
+    # One (x, y) pair per name, in a fixed order, so zoom patches can address traces by index
+    groups = dict(tuple(series.groupby(color, observed=True))) if color else {None: series}
+    empty = series.iloc[0:0]
+    return [(epoch_ms(groups.get(name, empty)['date']), groups.get(name, empty)['sales'].to_numpy()) for name in names]
+
+def trend_figure(traces, names, title, uirevision):
+    fig = go.Figure([go.Scatter(x=x, y=y, mode='lines', name=name or 'sales') for (x, y), name in zip(traces, names)])
+    fig.update_layout(title=title, xaxis_title='date', xaxis_type='date', yaxis_title='sales', showlegend=names != [None],
+                      uirevision=uirevision)
+    return fig
+
+def trend_patch(traces, title):
+    patch = Patch()
+    for i, (x, y) in enumerate(traces):
+        patch['data'][i]['x'] = x
+        patch['data'][i]['y'] = y
+    patch['layout']['title']['text'] = title
+    return patch
+
+# Figure skeletons
+# Figures with a fixed structure are built once in the layout; callbacks only send the values that change as a Patch,
+# so layout, template, gauge steps and geo settings are not rebuilt or re-sent on every filter change.
+COMPACT_MARGIN = dict(l=10, r=10, t=20, b=10)
+
+def gauge_figure(title, bands, axis_max):
+    low, target, high = bands
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=0,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': title, 'font': {'size': 10}},
+        gauge={
+            'axis': {'range': [0, axis_max]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, low], 'color': "red"},
+                {'range': [low, target], 'color': "yellow"},
+                {'range': [target, high], 'color': "green"}
+            ],
+            'threshold': {
+                'line': {'color': "black", 'width': 4},
+                'thickness': 0.75,
+                'value': target
+            }
+        }
+    ))
+    fig.update_layout(margin=COMPACT_MARGIN, font=dict(size=8))
+    return fig
+
+def gauge_patch(value, bands=None, axis_max=None):
+    patch = Patch()
+    patch['data'][0]['value'] = value
+    if bands is not None:
+        low, target, high = bands
+        for i, step in enumerate([[0, low], [low, target], [target, high]]):
+            patch['data'][0]['gauge']['steps'][i]['range'] = step
+        patch['data'][0]['gauge']['threshold']['value'] = target
+        patch['data'][0]['gauge']['axis']['range'] = [0, axis_max]
+    return patch
+
+def region_pie_figure():
+    fig = px.pie(pd.DataFrame({'region': [], 'sales': []}), names='region', values='sales', title="Sales by Region")
+    fig.update_traces(textinfo='percent+label', textfont_size=8)
+    fig.update_layout(margin=COMPACT_MARGIN, font=dict(size=8), title_font_size=10)
+    return fig
+
+def product_sales_figure():
+    # One trace per product (coloured by product), addressed by its position in `products`
+    fig = px.bar(
+        pd.DataFrame({'product': products, 'sales': 0.0}),
+        x='product',
+        y='sales',
+        title="Sales by Product",
+        color='product',
+        color_discrete_sequence=px.colors.qualitative.Plotly
+    )
+    fig.update_layout(
+        margin=COMPACT_MARGIN,
+        font=dict(size=8),
+        title_font_size=10,
+        xaxis_title="Product",
+        yaxis_title="sales",
+        xaxis_tickangle=45,
+        showlegend=False
+    )
+    return fig
+
+def choropleth_figure():
+    fig = px.choropleth(
+        pd.DataFrame({'country': [], 'sales': []}),
+        locations='country', locationmode='country names', color='sales',
+        title='Sales by Country', color_continuous_scale='Viridis'
+    )
+    fig.update_layout(margin=COMPACT_MARGIN, font=dict(size=8), title_font_size=10)
+    return fig
+
+def region_bar_figure():
+    fig = px.bar(pd.DataFrame({'region': [], 'sales': []}), x='region', y='sales', title="Sales Comparison by Region")
+    fig.update_layout(margin=COMPACT_MARGIN, font=dict(size=8), title_font_size=10)
+    return fig
+
+def salesperson_bar_figure():
+    fig = px.bar(
+        pd.DataFrame({'salesperson': [], 'sales': []}),
+        x='salesperson',
+        y='sales',
+        title="Sales by Salesperson vs Target",
+        color_discrete_sequence=['blue']
+    )
+    fig.add_scatter(x=[], y=[], mode='markers', name='Target', marker=dict(color='red', size=10, symbol='x'))
+    fig.update_layout(
+        margin=COMPACT_MARGIN,
+        font=dict(size=8),
+        title_font_size=10,
+        xaxis_title="Salesperson",
+        yaxis_title="Sales ($)",
+        xaxis_tickangle=45
+    )
+    return fig
+
+def data_patch(**traces):
+    # data_patch(**{'0.x': [...], '0.marker.color': [...]}) sets data[0].x and data[0].marker.color
+    patch = Patch()
+    for path, value in traces.items():
+        index, *keys = path.split('.')
+        target = patch['data'][int(index)]
+        for key in keys[:-1]:
+            target = target[key]
+        target[keys[-1]] = value
+    return patch
+
+# Logs table queries
+# The Logs DataTable pages, sorts and filters on the server. Text columns are categorical, so each one is handled as
+# (codes, labels): a filter_query predicate or a sort key is evaluated once per distinct label and mapped back to the
+# selected rows through their codes. `details` is the job_title/log_type/salesperson combination, so it is coded the
+# same way without ever materializing the per-row strings.
+LOG_COLUMNS = ['date', 'country', 'salesperson', 'marketing_channel', 'details']
+LOG_FILTER_OPERATORS = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='],
+                        ['icontains '], ['scontains '], ['contains '], ['datestartswith '], ['is nonblank'], ['is blank']]
+LOG_CACHE_SIZE = 16
+
+def split_filter_part(filter_part):
+    # The operator directly follows the column name; everything after it is the value (which may contain operator words)
+    name_part, brace, rest = filter_part.partition('}')
+    if not brace or '{' not in name_part:
+        return None, None, None
+    name = name_part[name_part.find('{') + 1:]
+    rest = rest.lstrip()
+    for operator_type in LOG_FILTER_OPERATORS:
+        for operator in operator_type:
+            if rest.startswith(operator):
+                value_part = rest[len(operator):].strip()
+                quote = value_part[:1]
+                if len(value_part) > 1 and quote in ("'", '"', '`') and value_part[-1] == quote:
+                    value = value_part[1:-1].replace('\\' + quote, quote)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                return name, operator_type[0].strip(), value
+    return None, None, None
+
+def log_column_codes(col, rows):
+    df = current_data()['frame']
+    if col == 'details':
+        jobs, logs, people = (df[c].cat for c in ['job_title', 'log_type', 'salesperson'])
+        codes = ((jobs.codes.to_numpy()[rows].astype(np.int32) * len(logs.categories)
+                  + logs.codes.to_numpy()[rows]) * len(people.categories) + people.codes.to_numpy()[rows])
+        labels = [f"{job} - {log} - {person}" for job in jobs.categories for log in logs.categories
+                  for person in people.categories]
+        return codes, np.array(labels, dtype=object)
+    return df[col].cat.codes.to_numpy()[rows], np.array(df[col].cat.categories, dtype=object)
+
+def date_bounds(value):
+    # A partial ISO date such as 2023 or 2023-05 covers the whole year or month
+    text = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value).strip()
+    start = pd.Timestamp(text)
+    freq = {4: 'YS', 7: 'MS'}.get(len(text), 'D')
+    return start.to_datetime64(), (start + pd.tseries.frequencies.to_offset(freq)).to_datetime64()
+
+def log_filter_mask(col, operator, value, rows):
+    if col == 'date':
+        dates = current_data()['frame']['date'].to_numpy()[rows]
+        if operator in ('is blank', 'is nonblank'):
+            return np.isnat(dates) if operator == 'is blank' else ~np.isnat(dates)
+        try:
+            start, end = date_bounds(value)
+        except ValueError:
+            return np.zeros(len(rows), dtype=bool)
+        return {
+            'ge': dates >= start,
+            'gt': dates >= end,
+            'le': dates < end,
+            'lt': dates < start,
+            'ne': (dates < start) | (dates >= end),
+        }.get(operator, (dates >= start) & (dates < end))
+    codes, labels = log_column_codes(col, rows)
+    if operator in ('is blank', 'is nonblank'):
+        # As in dash_table, a missing value or an empty string is blank
+        blank = (codes < 0) | (labels == '')[np.maximum(codes, 0)]
+        return blank if operator == 'is blank' else ~blank
+    value = str(value)
+    if operator in ('contains', 'scontains'):
+        matched = np.array([value in label for label in labels], dtype=bool)
+    elif operator == 'icontains':
+        matched = np.array([value.lower() in label.lower() for label in labels], dtype=bool)
+    elif operator == 'datestartswith':
+        matched = np.array([label.startswith(value) for label in labels], dtype=bool)
+    else:
+        matched = {
+            'ge': labels >= value,
+            'gt': labels > value,
+            'le': labels <= value,
+            'lt': labels < value,
+            'ne': labels != value,
+            'eq': labels == value,
+        }[operator].astype(bool)
+    return matched[codes]
+
+@functools.lru_cache(maxsize=LOG_CACHE_SIZE)
+def _log_order(version, filters, sort_key, filter_query):
+    rows = filter_rows(*filters)
+    for part in filter_query.split(' && ') if filter_query else []:
+        col, operator, value = split_filter_part(part)
+        if col in LOG_COLUMNS:
+            rows = rows[log_filter_mask(col, operator, value, rows)]
+
+    col, direction = sort_key
+    if col == 'date':
+        # Rows are stored in date order, so sorting by date is just a (reversed) view
+        ordered = rows if direction == 'asc' else rows[::-1]
+    else:
+        codes, labels = log_column_codes(col, rows)
+        rank = np.argsort(np.argsort(labels.astype(str)))[codes]
+        ordered = rows[np.argsort(rank if direction == 'asc' else -rank, kind='stable')]
+    ordered.setflags(write=False)
+    return ordered
+
+def log_page(filters, page_current, page_size, sort_by, filter_query):
+    sort_key = (sort_by[0]['column_id'], sort_by[0]['direction']) if sort_by else ('date', 'desc')
+    if QUERY_ENGINE == 'duckdb':
+        return duckdb_log_page(filters, page_current, page_size, sort_key, filter_query)
+    ordered = _log_order(rows_version(filters[1]), tuple(filters), sort_key, filter_query or '')
+    rows = ordered[page_current * page_size:(page_current + 1) * page_size]
+    page = current_data()['frame'][['date', 'country', 'salesperson', 'marketing_channel', 'job_title', 'log_type']].take(rows)
+    page = page.assign(details=build_details(page))[LOG_COLUMNS]
+    return page.to_dict('records'), len(ordered)
+
+# The same table with the duckdb engine: the filter query becomes WHERE conditions and the page one ORDER BY/LIMIT
+# query. Ties keep the stored row order (date, then file and row number), as in _log_order.
+LOG_COLUMN_SQL = {'details': "job_title || ' - ' || log_type || ' - ' || salesperson"}
+LOG_COMPARISONS = {'ge': '>=', 'gt': '>', 'le': '<=', 'lt': '<', 'ne': '<>', 'eq': '='}
+
+def log_column_sql(col):
+    return LOG_COLUMN_SQL.get(col, f'"{col}"')
+
+def duckdb_log_condition(col, operator, value):
+    # log_filter_mask() as a WHERE condition, with its parameters
+    if col == 'date':
+        if operator in ('is blank', 'is nonblank'):
+            return 'date IS NULL' if operator == 'is blank' else 'date IS NOT NULL', []
+        try:
+            start, end = (pd.Timestamp(bound) for bound in date_bounds(value))
+        except ValueError:
+            return 'false', []
+        return {
+            'ge': ('date >= ?', [start]),
+            'gt': ('date >= ?', [end]),
+            'le': ('date < ?', [end]),
+            'lt': ('date < ?', [start]),
+            'ne': ('(date < ? OR date >= ?)', [start, end]),
+        }.get(operator, ('(date >= ? AND date < ?)', [start, end]))
+    expr = log_column_sql(col)
+    if operator in ('is blank', 'is nonblank'):
+        blank = f"({expr} IS NULL OR {expr} = '')"
+        return blank if operator == 'is blank' else f'NOT {blank}', []
+    value = str(value)
+    if operator in ('contains', 'scontains'):
+        return f'contains({expr}, ?)', [value]
+    if operator == 'icontains':
+        return f'contains(lower({expr}), ?)', [value.lower()]
+    if operator == 'datestartswith':
+        return f'starts_with({expr}, ?)', [value]
+    return f'{expr} {LOG_COMPARISONS[operator]} ?', [value]
+
+@functools.lru_cache(maxsize=LOG_CACHE_SIZE)
+def _duckdb_log_count(source, condition, params):
+    # The source lists the snapshot's files, so it also keys the data the count was taken from
+    return duckdb_connection().execute(f"SELECT count(*) FROM {source} WHERE {condition}", list(params)).fetchone()[0]
+
+def duckdb_log_page(filters, page_current, page_size, sort_key, filter_query):
+    data = current_data()
+    where, params = duckdb_filters(*filters)
+    for part in filter_query.split(' && ') if filter_query else []:
+        col, operator, value = split_filter_part(part)
+        if col in LOG_COLUMNS:
+            condition, values = duckdb_log_condition(col, operator, value)
+            where.append(condition)
+            params += values
+    col, direction = sort_key
+    direction = 'DESC' if direction == 'desc' else 'ASC'
+    stored = ['date', 'filename', 'file_row_number']
+    if col == 'date':
+        order = [f'{key} {direction}' for key in stored]
+    else:
+        order = [f'{log_column_sql(col)} {direction}'] + stored if col in LOG_COLUMNS else stored
+    source = duckdb_source(data['parts'], row_numbers=True)
+    condition = ' AND '.join(where)
+    select = ', '.join(f'{log_column_sql(col)} AS "{col}"' for col in LOG_COLUMNS)
+    page = duckdb_connection().execute(
+        f"SELECT {select} FROM {source} WHERE {condition} ORDER BY {', '.join(order)} LIMIT ? OFFSET ?",
+        params + [page_size, page_current * page_size]).df()
+    return duckdb_typed(page, data['dtypes']).to_dict('records'), _duckdb_log_count(source, condition, tuple(params))
+
+# Tab-aware rendering
+# Only the visible tab recomputes when a filter changes. Every tab remembers the inputs it was last rendered with in a
+# dcc.Store; hidden tabs are left stale and catch up when they are opened, and reopening a tab whose inputs have not
+# changed since its last render costs nothing.
+TABS = ['overview', 'products', 'regions', 'engagement', 'promotions', 'logs', 'salesperson']
+
+def skip_tab_update(tab, active_tab, rendered, inputs):
+    if active_tab != tab or rendered == inputs:
+        raise PreventUpdate
+
+# Background callbacks
+# The heavy tabs render in background jobs so that a slow query never holds a web worker: the callback request starts
+# a job process (forked from the worker, with the dataset already loaded) and the browser polls for its result every
+# BACKGROUND_POLL_MS. Jobs and their results are kept in a diskcache under the data directory, so any worker on the
+# host can answer a poll. When the inputs change while a job is still running, the browser has the stale job
+# terminated with its next request, and the tab shows "Updating…" until the result arrives. Jobs are only started for
+# inputs the tab does not show yet: a clientside gate passes the inputs on while the tab is visible, and a plain
+# callback in the web worker passes them on to the job only when they differ from the tab's rendered inputs (so
+# reopening an unchanged tab sends one small request and starts nothing). Without the diskcache package (or with
+# DASHBOARD_BACKGROUND_CALLBACKS=0) the same callbacks run in the web worker.
+BACKGROUND_TABS = ['regions', 'engagement', 'promotions', 'salesperson']
+BACKGROUND_CALLBACKS = diskcache is not None and os.environ.get('DASHBOARD_BACKGROUND_CALLBACKS', '1') == '1'
+BACKGROUND_POLL_MS = 250
+
+def background_manager():
+    if not BACKGROUND_CALLBACKS:
+        return None
+    return dash.DiskcacheManager(diskcache.Cache(os.path.join(DATA_DIR, 'jobs')))
+
+def tab_request(tab, inputs, versions=(data_version,)):
+    # The tab's callback is triggered by its gates (the 'request' argument) and reads the inputs as States. Its
+    # rendered inputs must be the gated inputs without the active tab, followed by the current `versions`
+    dash.clientside_callback(
+        f"function(...values) {{ return values[values.length - 1] === '{tab}' ? values : window.dash_clientside.no_update; }}",
+        Output(f'{tab}-visible', 'data'),
+        inputs
+    )
+
+    @dash.callback(
+        Output(f'{tab}-request', 'data'),
+        Input(f'{tab}-visible', 'data'),
+        State(f'{tab}-rendered', 'data'),
+        prevent_initial_call=True
+    )
+    @timed_callback
+    def request_tab(values, rendered):
+        if values is None or rendered == values[:-1] + [version() for version in versions]:
+            raise PreventUpdate
+        return values
+
+    return [Input(f'{tab}-request', 'data')] + [State(dep.component_id, dep.component_property) for dep in inputs]
+
+def background_options(tab):
+    options = {'running': [(Output(f'{tab}-progress', 'children'), "Updating…", "")], 'prevent_initial_call': True}
+    if BACKGROUND_CALLBACKS:
+        options.update(background=True, interval=BACKGROUND_POLL_MS)
+    return options
+
+# Response encoding
+# Callback responses are encoded with orjson (when installed) and compressed by flask-compress (brotli or gzip, per
+# the client's Accept-Encoding). With DASHBOARD_REPORT_PAYLOADS=1 each callback's raw and on-the-wire bytes are
+# printed, with its encode time: the time from the callback returning (see timed_callback) to the raw response, which
+# is Dash preparing and JSON-encoding the outputs.
+REPORT_PAYLOADS = os.environ.get('DASHBOARD_REPORT_PAYLOADS', '0') == '1'
+
+if orjson is not None:
+    pio.json.config.default_engine = 'orjson'
+
+def timed_callback(callback):
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        outputs = callback(*args, **kwargs)
+        # Background jobs run outside the request; their results are encoded in the job
+        if REPORT_PAYLOADS and flask.has_request_context():
+            flask.g.callback_returned = time.perf_counter()
+        return outputs
+    return wrapper
+
+def record_raw_size(response):
+    if flask.request.path.endswith('/_dash-update-component') and response.status_code == 200:
+        flask.g.raw_bytes = response.calculate_content_length()
+        if 'callback_returned' in flask.g:
+            flask.g.encode_seconds = time.perf_counter() - flask.g.callback_returned
+    return response
+
+def report_payload(response):
+    if not flask.request.path.endswith('/_dash-update-component') or 'raw_bytes' not in flask.g:
+        return response
+    output = (flask.request.get_json(silent=True) or {}).get('output', '?')
+    encode = f"{flask.g.encode_seconds * 1000:.1f} ms" if 'encode_seconds' in flask.g else 'n/a'
+    print(f"{output.strip('.')[:60]}: {flask.g.raw_bytes:,} B raw -> {response.calculate_content_length():,} B "
+          f"{response.headers.get('Content-Encoding', 'identity')}, "
+          f"encode {encode} ({pio.json.config.default_engine})")
+    return response
+
+def setup_response_encoding(server):
+    if REPORT_PAYLOADS:
+        # after_request hooks run in reverse order: report_payload runs after compression, record_raw_size before it
+        server.after_request(report_payload)
+    if flask_compress is not None:
+        server.config.setdefault('COMPRESS_ALGORITHM', ['br', 'gzip'])
+        flask_compress.Compress(server)
+    if REPORT_PAYLOADS:
+        server.after_request(record_raw_size)
+
+# Promotion registry
+# Promotions are kept in a SQLite database (WAL mode) under DATA_DIR, so every worker reads and writes the same registry
+# and it survives restarts. Names are unique (the primary key) and promotions are indexed by channel and by date window.
+# Every write bumps a revision counter in the same transaction. Readers poll PRAGMA data_version on a long-lived
+# connection, which only changes once another connection (any thread or worker) has committed, so the counter, and
+# the lookups cached under it, are only re-read after a write.
+PROMOTION_COLUMNS = ['promo_event', 'start_date', 'end_date', 'target', 'channel', 'redemption_rate']
+PROMOTIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS promotions (
+    promo_event TEXT PRIMARY KEY,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    target TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    redemption_rate REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS promotions_by_channel ON promotions (channel, start_date);
+CREATE INDEX IF NOT EXISTS promotions_by_window ON promotions (start_date, end_date);
+CREATE TABLE IF NOT EXISTS promotions_revision (revision INTEGER NOT NULL);
+"""
+# Seeded into a new registry: the promotions that appear in the generated data
+DEFAULT_PROMOTIONS = [
+    {'promo_event': e, 'start_date': '2022-05-01', 'end_date': '2025-03-31', 'target': 'All', 'channel': 'All',
+     'redemption_rate': random.uniform(0.1, 0.5)}
+    for e in promo_events if e != 'None'
 ]
+PROMOTIONS_CACHE_SIZE = 32
+PROMOTIONS_READY = set()  # database paths whose schema exists
+PROMOTIONS_WATCH = {}
+PROMOTIONS_LOCK = threading.Lock()
+
+def promotions_path():
+    return os.path.join(DATA_DIR, 'promotions.sqlite')
+
+def promotions_connection():
+    # Autocommit mode: writes open their own BEGIN IMMEDIATE transaction
+    path = promotions_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    if path not in PROMOTIONS_READY:
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(PROMOTIONS_SCHEMA)
+        connection.execute('BEGIN IMMEDIATE')
+        if connection.execute('SELECT count(*) FROM promotions_revision').fetchone()[0] == 0:
+            insert_promotions(connection, DEFAULT_PROMOTIONS)
+            connection.execute('INSERT INTO promotions_revision VALUES (1)')
+        connection.execute('COMMIT')
+        PROMOTIONS_READY.add(path)
+    return connection
+
+def insert_promotions(connection, promotions):
+    before = connection.total_changes
+    connection.executemany(f"INSERT OR IGNORE INTO promotions ({', '.join(PROMOTION_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                           [tuple(promotion[col] for col in PROMOTION_COLUMNS) for promotion in promotions])
+    return connection.total_changes - before
+
+def add_promotions(promotions):
+    # Bulk insert in one transaction; names that already exist are skipped. Returns the number of promotions added.
+    connection = promotions_connection()
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        added = insert_promotions(connection, promotions)
+        if added:
+            connection.execute('UPDATE promotions_revision SET revision = revision + 1')
+        connection.execute('COMMIT')
+    finally:
+        connection.close()  # without COMMIT the transaction is rolled back
+    return added
+
+def promotions_revision():
+    with PROMOTIONS_LOCK:
+        if PROMOTIONS_WATCH.get('key') != (os.getpid(), promotions_path()):
+            # Connections must not cross a fork, and configure() may point DATA_DIR elsewhere
+            PROMOTIONS_WATCH.clear()
+            PROMOTIONS_WATCH.update(key=(os.getpid(), promotions_path()), connection=promotions_connection(),
+                                    data_version=None)
+        connection = PROMOTIONS_WATCH['connection']
+        data_version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != PROMOTIONS_WATCH['data_version']:
+            PROMOTIONS_WATCH['revision'] = connection.execute('SELECT revision FROM promotions_revision').fetchone()[0]
+            PROMOTIONS_WATCH['data_version'] = data_version
+        return PROMOTIONS_WATCH['revision']
+
+@functools.lru_cache(maxsize=PROMOTIONS_CACHE_SIZE)
+def _find_promotions(revision, name, channel, start_date, end_date):
+    clauses, params = [], []
+    if name is not None:
+        clauses.append('promo_event = ?')
+        params.append(name)
+    if channel is not None and channel != 'All':
+        clauses.append("channel IN (?, 'All')")
+        params.append(channel)
+    if start_date is not None:
+        clauses.append('end_date >= ?')
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append('start_date <= ?')
+        params.append(end_date)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    connection = promotions_connection()
+    try:
+        return pd.read_sql_query(f"SELECT {', '.join(PROMOTION_COLUMNS)} FROM promotions{where} ORDER BY start_date, promo_event",
+                                 connection, params=params)
+    finally:
+        connection.close()
+
+def find_promotions(name=None, channel=None, start_date=None, end_date=None):
+    # Promotions whose window overlaps [start_date, end_date]; a channel also matches promotions that run on 'All'
+    day = lambda value: pd.Timestamp(value).strftime('%Y-%m-%d') if value is not None else None
+    return _find_promotions(promotions_revision(), name, channel, day(start_date), day(end_date))
+
+# Promotion windows
+# Joins each promotion's date window against daily sales: one cube query gives daily sales per channel, running sums
+# turn every window into two binary searches, and a promotion only counts the sales of its own channel ('All': every
+# channel left by the filters). Its average daily sales are compared with the same channel's over the whole range.
+def promotion_window_sales(promotions, filters):
+    daily = cube_query('base', *filters, by=['date', 'marketing_channel'], measures=['sales'])
+    grid = daily.pivot_table(index='date', columns='marketing_channel', values='sales', aggfunc='sum', observed=True,
+                             sort=True).fillna(0)
+    grid.columns = grid.columns.astype(str)
+    grid['All'] = grid.sum(axis=1)
+    dates = grid.index.to_numpy()
+    running = np.vstack([np.zeros(grid.shape[1]), grid.to_numpy().cumsum(axis=0)])
+    first = np.searchsorted(dates, pd.to_datetime(promotions['start_date']).to_numpy())
+    last = np.searchsorted(dates, pd.to_datetime(promotions['end_date']).to_numpy(), side='right')
+    columns = [grid.columns.get_loc(channel) if channel in grid.columns else None for channel in promotions['channel']]
+    sales = np.array([running[stop, col] - running[start, col] if col is not None else 0.0
+                      for start, stop, col in zip(first, last, columns)])
+    baseline = np.array([running[-1, col] / len(dates) if col is not None and len(dates) else 0.0 for col in columns])
+    days = last - first
+    return promotions.assign(days=days, sales=sales, daily_sales=np.where(days > 0, sales / np.maximum(days, 1), 0.0),
+                             baseline=baseline)
+
+def promotion_windows_figure(windows):
+    fig = go.Figure([
+        go.Bar(x=windows['promo_event'], y=windows['daily_sales'], name="During promotion", marker_color='#2563eb',
+               customdata=windows[['start_date', 'end_date', 'channel']].to_numpy(),
+               hovertemplate="%{x} (%{customdata[2]})<br>%{customdata[0]} to %{customdata[1]}<br>$%{y:,.2f} per day<extra></extra>"),
+        go.Bar(x=windows['promo_event'], y=windows['baseline'], name="Whole range", marker_color='#9ca3af',
+               hovertemplate="%{x}<br>$%{y:,.2f} per day<extra></extra>"),
+    ])
+    fig.update_layout(title="Average Daily Sales During Promotion Windows", barmode='group', yaxis_title="Sales per day ($)",
+                      margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
+    return fig
 
 # Layout
-app.layout = html.Div([
-    html.H1("AI-Solutions Sales Dashboard", className="text-xl font-bold text-center text-blue-800 mb-2"),
-    # Global Filters
-    html.Div([
-        html.Label("Select Date Range:", className="text-sm font-semibold text-gray-700 mr-2"),
-        dcc.DatePickerRange(
-            id='date-picker',
-            min_date_allowed=df['date'].min(),
-            max_date_allowed=df['date'].max(),
-            start_date=df['date'].min(),
-            end_date=df['date'].max(),
-            display_format='YYYY-MM-DD',
-            className="border rounded p-1 text-sm"
-        ),
-        html.Label("Select Region:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-        dcc.Dropdown(
-            id='region-filter',
-            options=[{'label': 'All', 'value': 'All'}] + [{'label': r, 'value': r} for r in df['region'].unique()],
-            value='All',
-            className="w-40 border rounded p-1 text-sm"
-        ),
-        html.Label("Select Salesperson:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-        dcc.Dropdown(
-            id='salesperson-filter',
-            options=[{'label': 'All', 'value': 'All'}] + [{'label': s, 'value': s} for s in df['salesperson'].unique()],
-            value='All',
-            className="w-40 border rounded p-1 text-sm"
-        ),
-        html.Label("Select Marketing Channel:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-        dcc.Dropdown(
-            id='channel-filter',
-            options=[{'label': 'All', 'value': 'All'}] + [{'label': c, 'value': c} for c in df['marketing_channel'].unique()],
-            value='All',
-            className="w-40 border rounded p-1 text-sm"
-        ),
-    ], className="flex items-center justify-center gap-2 mb-2 flex-wrap bg-gray-100 p-2 rounded-lg shadow"),
-
-    # Tabs
-    dcc.Tabs(id='tabs', className="custom-tabs", children=[
-        # Overview Tab
-        dcc.Tab(label="Overview", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.Div([
-                html.Div([
-                    html.H3("Total Sales vs Target", className="text-sm font-semibold text-gray-700"),
-                    dcc.Graph(id='kpi-sales-gauge', className="h-32")
-                ], className="kpi-card"),
-                html.Div([
-                    html.H3("Conversion Rate", className="text-sm font-semibold text-gray-700"),
-                    dcc.Graph(id='kpi-conversion-gauge', className="h-32")
-                ], className="kpi-card"),
-                html.Div([
-                    html.H3("Sales Growth", className="text-sm font-semibold text-gray-700"),
-                    dcc.Graph(id='kpi-growth-gauge', className="h-32")
-                ], className="kpi-card"),
+# Built from the dataset metadata (date bounds, dropdown options), so it does not need the frame itself.
+def build_layout(meta):
+    return html.Div([
+        html.H1("AI-Solutions Sales Dashboard", className="text-xl font-bold text-center text-blue-800 mb-2"),
+        # Global Filters
+        html.Div([
+            html.Label("Select Date Range:", className="text-sm font-semibold text-gray-700 mr-2"),
+            dcc.DatePickerRange(
+                id='date-picker',
+                min_date_allowed=meta['min_date'],
+                max_date_allowed=meta['max_date'],
+                start_date=meta['min_date'],
+                end_date=meta['max_date'],
+                display_format='YYYY-MM-DD',
+                className="border rounded p-1 text-sm"
+            ),
+            html.Label("Select Region:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+            dcc.Dropdown(
+                id='region-filter',
+                options=[{'label': 'All', 'value': 'All'}] + [{'label': r, 'value': r} for r in meta['regions']],
+                value='All',
+                className="w-40 border rounded p-1 text-sm"
+            ),
+            html.Label("Select Salesperson:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+            dcc.Dropdown(
+                id='salesperson-filter',
+                options=[{'label': 'All', 'value': 'All'}] + [{'label': s, 'value': s} for s in meta['salespersons']],
+                value='All',
+                className="w-40 border rounded p-1 text-sm"
+            ),
+            html.Label("Select Marketing Channel:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+            dcc.Dropdown(
+                id='channel-filter',
+                options=[{'label': 'All', 'value': 'All'}] + [{'label': c, 'value': c} for c in meta['marketing_channels']],
+                value='All',
+                className="w-40 border rounded p-1 text-sm"
+            ),
+            dcc.Checklist(
+                id='exact-mode',
+                options=[{'label': 'Exact trends', 'value': 'exact'}],
+                value=[],
+                className="text-sm text-gray-700 ml-2"
+            ),
+            dcc.Checklist(
+                id='live-mode',
+                options=[{'label': 'Live', 'value': 'live'}],
+                value=[],
+                className="text-sm text-gray-700 ml-2"
+            ),
+            dcc.Interval(id='live-interval', interval=LIVE_INTERVAL_MS, disabled=True),
+            dcc.Upload(
+                id='upload-data',
+                children=html.Span(f"Import CSV/Parquet (up to {UPLOAD_MAX_MB:g} MB)"),
+                accept=','.join(UPLOAD_FORMATS),
+                max_size=int(UPLOAD_MAX_MB * 1024 * 1024),
+                className="text-sm text-blue-800 border border-dashed rounded px-2 py-1 ml-2 cursor-pointer"
+            ),
+            html.Span(id='upload-status', className="text-sm text-gray-700"),
+            dcc.Interval(id='upload-interval', interval=UPLOAD_POLL_MS, disabled=True),
+        ], className="flex items-center justify-center gap-2 mb-2 flex-wrap bg-gray-100 p-2 rounded-lg shadow"),
+
+        # Tab render state: the inputs each tab was last rendered with
+        html.Div([dcc.Store(id=f'{tab}-rendered') for tab in TABS + ['sales-trend', 'salesperson-trend']]),
+        html.Div([dcc.Store(id=f'{tab}-{gate}') for tab in BACKGROUND_TABS for gate in ['visible', 'request']]),
+        dcc.Store(id='viewport-width'),
+
+        # Tabs
+        dcc.Tabs(id='tabs', value='overview', className="custom-tabs", children=[
+            # Overview Tab
+            dcc.Tab(label="Overview", value='overview', className="custom-tab", selected_className="custom-tab--selected", children=[
                 html.Div([
-                    html.H3("Team Performance", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='team-status', className="text-base font-bold")
+                    html.Div([
+                        html.H3("Total Sales vs Target", className="text-sm font-semibold text-gray-700"),
+                        dcc.Graph(id='kpi-sales-gauge', className="h-32", figure=gauge_figure("Sales ($)", (0.8, 1, 1.2), 1.2))
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Conversion Rate", className="text-sm font-semibold text-gray-700"),
+                        dcc.Graph(id='kpi-conversion-gauge', className="h-32", figure=gauge_figure("Conversion Rate (%)", (3, 5, 10), 10))
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Sales Growth", className="text-sm font-semibold text-gray-700"),
+                        dcc.Graph(id='kpi-growth-gauge', className="h-32", figure=gauge_figure("Sales Growth (%)", (5, 10, 20), 20))
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Team Performance", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='team-status', className="text-base font-bold")
+                    ], className="kpi-card"),
+                ], className="grid grid-cols-1 md:grid-cols-4 gap-2 mb-2"),
+                    html.Div([
+                        html.H3("Total Sales Revenue", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='total-sales', className="text-base font-bold text-blue-600")
                 ], className="kpi-card"),
-            ], className="grid grid-cols-1 md:grid-cols-4 gap-2 mb-2"),
                 html.Div([
-                    html.H3("Total Sales Revenue", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='total-sales', className="text-base font-bold text-blue-600")
-            ], className="kpi-card"),
-            html.Div([
-            dcc.Graph(id='sales-trend', className="graph-card", style={'transform': 'scale(0.8)', 'transformOrigin': 'center'}),
-            dcc.Graph(id='region-pie', className="graph-card", style={'transform': 'scale(0.8)', 'transformOrigin': 'center'})
-        ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
-    ]),
+                dcc.Graph(id='sales-trend', className="graph-card", style={'transform': 'scale(0.8)', 'transformOrigin': 'center'}),
+                dcc.Graph(id='region-pie', className="graph-card", style={'transform': 'scale(0.8)', 'transformOrigin': 'center'}, figure=region_pie_figure())
+            ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
+        ]),
 
-        # Products Tab
-        dcc.Tab(label="Products", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.Div([
-                html.H3("Select Product", className="text-sm font-semibold text-gray-700"),
-                dcc.Dropdown(
-                    id='product-dropdown',
-                    options=[{'label': product, 'value': product} for product in products],
-                    value=products[0],
-                    className="w-1/3 mx-auto border rounded p-1 text-sm"
-                )
-            ], className="text-center mb-2"),
-            html.Div([
+            # Products Tab
+            dcc.Tab(label="Products", value='products', className="custom-tab", selected_className="custom-tab--selected", children=[
                 html.Div([
-                    html.H3("Top-Selling Product", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='top-product', className="text-base font-bold text-green-600")
-                ], className="product-kpi-card"),
+                    html.H3("Select Product", className="text-sm font-semibold text-gray-700"),
+                    dcc.Dropdown(
+                        id='product-dropdown',
+                        options=[{'label': product, 'value': product} for product in products],
+                        value=products[0],
+                        className="w-1/3 mx-auto border rounded p-1 text-sm"
+                    )
+                ], className="text-center mb-2"),
                 html.Div([
-                    html.H3("Low-Performing Product", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='low-product', className="text-base font-bold text-red-600")
-                ], className="product-kpi-card"),
+                    html.Div([
+                        html.H3("Top-Selling Product", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='top-product', className="text-base font-bold text-green-600")
+                    ], className="product-kpi-card"),
+                    html.Div([
+                        html.H3("Low-Performing Product", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='low-product', className="text-base font-bold text-red-600")
+                    ], className="product-kpi-card"),
+                    html.Div([
+                        html.H3("Average Profit Margin", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='profit-margin', className="text-base font-bold text-yellow-600")
+                    ], className="product-kpi-card"),
+                ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
                 html.Div([
-                    html.H3("Average Profit Margin", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='profit-margin', className="text-base font-bold text-yellow-600")
-                ], className="product-kpi-card"),
-            ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
-            html.Div([
-                dcc.Graph(id='product-sales-chart', className="product-graph-card")
-            ], className="grid grid-cols-1 gap-2 mb-2"),
-        ]),
+                    dcc.Graph(id='product-sales-chart', className="product-graph-card", figure=product_sales_figure())
+                ], className="grid grid-cols-1 gap-2 mb-2"),
+            ]),
 
-        # Regions Tab
-        dcc.Tab(label="Regions", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.H2("Sales Distribution by Region", className="text-base font-bold text-blue-800 mb-2"),
-            html.Div([
-                dcc.Graph(id='choropleth-map', className="graph-card"),
-                dcc.Graph(id='region-bar', className="graph-card"),
-                dcc.Graph(id='age-dist', className="graph-card")
-            ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
-        ]),
+            # Regions Tab
+            dcc.Tab(label="Regions", value='regions', className="custom-tab", selected_className="custom-tab--selected", children=[
+                html.P(id='regions-progress', className="text-sm text-gray-500 mb-1"),
+                html.H2("Sales Distribution by Region", className="text-base font-bold text-blue-800 mb-2"),
+                html.Div([
+                    dcc.Graph(id='choropleth-map', className="graph-card", figure=choropleth_figure()),
+                    dcc.Graph(id='region-bar', className="graph-card", figure=region_bar_figure()),
+                    dcc.Graph(id='age-dist', className="graph-card")
+                ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
+            ]),
 
-        # User Engagement Tab
-        dcc.Tab(label="User Engagement", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.Div([
-                html.Label("Segment By:", className="text-sm font-semibold text-gray-700 mr-2"),
-                dcc.Dropdown(
-                    id='engagement-segment',
-                    options=[
-                        {'label': 'All', 'value': 'All'},
-                        {'label': 'Age Group', 'value': 'age_group'},
-                        {'label': 'Region', 'value': 'region'},
-                        {'label': 'Salesperson', 'value': 'salesperson'}
-                    ],
-                    value='All',
-                    className="w-40 border rounded p-1 text-sm"
-                )
-            ], className="mb-2"),
-            html.Div([
+            # User Engagement Tab
+            dcc.Tab(label="User Engagement", value='engagement', className="custom-tab", selected_className="custom-tab--selected", children=[
+                html.P(id='engagement-progress', className="text-sm text-gray-500 mb-1"),
                 html.Div([
-                    html.H3("Daily Active Users", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='dau', className="text-base font-bold text-green-600")
-                ], className="kpi-card"),
+                    html.Label("Segment By:", className="text-sm font-semibold text-gray-700 mr-2"),
+                    dcc.Dropdown(
+                        id='engagement-segment',
+                        options=[
+                            {'label': 'All', 'value': 'All'},
+                            {'label': 'Age Group', 'value': 'age_group'},
+                            {'label': 'Region', 'value': 'region'},
+                            {'label': 'Salesperson', 'value': 'salesperson'}
+                        ],
+                        value='All',
+                        className="w-40 border rounded p-1 text-sm"
+                    )
+                ], className="mb-2"),
                 html.Div([
-                    html.H3("Avg Session Duration", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='session-duration', className="text-base font-bold text-blue-600")
-                ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Daily Active Users", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='dau', className="text-base font-bold text-green-600")
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Avg Session Duration", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='session-duration', className="text-base font-bold text-blue-600")
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Retention Rate", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='retention', className="text-base font-bold text-red-600")
+                    ], className="kpi-card"),
+                ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
                 html.Div([
-                    html.H3("Retention Rate", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='retention', className="text-base font-bold text-red-600")
-                ], className="kpi-card"),
-            ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
-            html.Div([
-                dcc.Graph(id='engagement-trend', className="graph-card"),
-                dcc.Graph(id='engagement-funnel', className="graph-card"),
-                dcc.Graph(id='cohort-analysis', className="graph-card")
-            ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
-        ]),
+                    dcc.Graph(id='engagement-trend', className="graph-card"),
+                    dcc.Graph(id='engagement-funnel', className="graph-card"),
+                    dcc.Graph(id='cohort-analysis', className="graph-card")
+                ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
+            ]),
 
-        # Promotions Tab
-        dcc.Tab(label="Promotions", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.Div([
-                dcc.Graph(id='promo-performance', className="graph-card"),
-                dcc.Graph(id='promo-correlation', className="graph-card")
-            ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
-            html.Div([
+            # Promotions Tab
+            dcc.Tab(label="Promotions", value='promotions', className="custom-tab", selected_className="custom-tab--selected", children=[
+                html.P(id='promotions-progress', className="text-sm text-gray-500 mb-1"),
                 html.Div([
-                    html.H3("Total Redemptions", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='promo-redemptions', className="text-base font-bold text-green-600")
-                ], className="kpi-card"),
+                    dcc.Graph(id='promo-performance', className="graph-card"),
+                    dcc.Graph(id='promo-correlation', className="graph-card")
+                ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
                 html.Div([
-                    html.H3("Average ROI", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='promo-roi', className="text-base font-bold text-blue-600")
-                ], className="kpi-card"),
-            ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
-            html.H2("Manage Promotions", className="text-base font-bold text-blue-800 mb-2"),
-            html.Div([
-                html.Label("Promotion Name:", className="text-sm font-semibold text-gray-700 mr-2"),
-                dcc.Input(id='input-promo', type='text', placeholder='Enter promo name', className="w-32 border rounded p-1 text-sm"),
-                html.Label("Start Date:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-                dcc.DatePickerSingle(id='promo-start', display_format='YYYY-MM-DD', className="border rounded p-1 text-sm"),
-                html.Label("End Date:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-                dcc.DatePickerSingle(id='promo-end', display_format='YYYY-MM-DD', className="border rounded p-1 text-sm"),
-                html.Label("Target:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-                dcc.Dropdown(
-                    id='input-target',
-                    options=[{'label': t, 'value': t} for t in ['All', 'New Users', 'Enterprise']],
-                    placeholder='Select target',
-                    className="w-32 border rounded p-1 text-sm"
-                ),
-                html.Label("Channel:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
-                dcc.Dropdown(
-                    id='input-channel',
-                    options=[{'label': c, 'value': c} for c in marketing_channels],
-                    placeholder='Select channel',
-                    className="w-32 border rounded p-1 text-sm"
-                ),
-                html.Button('Add Promotion', id='add-promo-button', n_clicks=0, className="ml-2 bg-blue-600 text-white px-2 py-1 rounded hover:bg-blue-700 text-sm"),
-                html.Div(id='promo-form-output', className="mt-2 text-green-600 text-sm")
-            ], className="flex items-center justify-center gap-2 flex-wrap mb-2"),
-        ]),
+                    html.Div([
+                        html.H3("Total Redemptions", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='promo-redemptions', className="text-base font-bold text-green-600")
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Average ROI", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='promo-roi', className="text-base font-bold text-blue-600")
+                    ], className="kpi-card"),
+                ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
+                html.Div([
+                    dcc.Graph(id='promo-windows', className="graph-card")
+                ], className="grid grid-cols-1 gap-2 mb-2"),
+                html.H2("Manage Promotions", className="text-base font-bold text-blue-800 mb-2"),
+                html.Div([
+                    html.Label("Promotion Name:", className="text-sm font-semibold text-gray-700 mr-2"),
+                    dcc.Input(id='input-promo', type='text', placeholder='Enter promo name', className="w-32 border rounded p-1 text-sm"),
+                    html.Label("Start Date:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+                    dcc.DatePickerSingle(id='promo-start', display_format='YYYY-MM-DD', className="border rounded p-1 text-sm"),
+                    html.Label("End Date:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+                    dcc.DatePickerSingle(id='promo-end', display_format='YYYY-MM-DD', className="border rounded p-1 text-sm"),
+                    html.Label("Target:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+                    dcc.Dropdown(
+                        id='input-target',
+                        options=[{'label': t, 'value': t} for t in ['All', 'New Users', 'Enterprise']],
+                        placeholder='Select target',
+                        className="w-32 border rounded p-1 text-sm"
+                    ),
+                    html.Label("Channel:", className="text-sm font-semibold text-gray-700 ml-2 mr-2"),
+                    dcc.Dropdown(
+                        id='input-channel',
+                        options=[{'label': c, 'value': c} for c in marketing_channels],
+                        placeholder='Select channel',
+                        className="w-32 border rounded p-1 text-sm"
+                    ),
+                    html.Button('Add Promotion', id='add-promo-button', n_clicks=0, className="ml-2 bg-blue-600 text-white px-2 py-1 rounded hover:bg-blue-700 text-sm"),
+                    html.Div(id='promo-form-output', className="mt-2 text-green-600 text-sm"),
+                    dcc.Store(id='promo-registry')
+                ], className="flex items-center justify-center gap-2 flex-wrap mb-2"),
+            ]),
 
-        # Logs Tab
-        dcc.Tab(label="Logs", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.H2("System Logs", className="text-base font-bold text-blue-800", style={'margin': '20px'}),
-            dash_table.DataTable(
-                id='log-table',
-                columns=[
-                    {"name": "Timestamp", "id": "date"},
-                    {"name": "Country", "id": "country"},
-                    {"name": "Salesperson", "id": "salesperson"},
-                    {"name": "Channel", "id": "marketing_channel"},
-                    {"name": "Details", "id": "details"}
-                ],
-                style_table={'overflowX': 'auto'},
-                style_cell={'textAlign': 'left'},
-                page_size=5,
-                sort_action='native',
-                filter_action='native'
-            ),
-        ]),
+            # Logs Tab
+            dcc.Tab(label="Logs", value='logs', className="custom-tab", selected_className="custom-tab--selected", children=[
+                html.H2("System Logs", className="text-base font-bold text-blue-800", style={'margin': '20px'}),
+                dash_table.DataTable(
+                    id='log-table',
+                    columns=[
+                        {"name": "Timestamp", "id": "date"},
+                        {"name": "Country", "id": "country"},
+                        {"name": "Salesperson", "id": "salesperson"},
+                        {"name": "Channel", "id": "marketing_channel"},
+                        {"name": "Details", "id": "details"}
+                    ],
+                    style_table={'overflowX': 'auto'},
+                    style_cell={'textAlign': 'left'},
+                    page_current=0,
+                    page_size=5,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='single',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query=''
+                ),
+                html.P(id='log-count', className="text-sm text-gray-700", style={'margin': '10px 20px'}),
+            ]),
 
-        # Salesperson Tab
-        dcc.Tab(label="Salesperson", className="custom-tab", selected_className="custom-tab--selected", children=[
-            html.H2("Individual and Team Performance", className="text-base font-bold text-blue-800 mb-2"),
-            html.Div([
+            # Salesperson Tab
+            dcc.Tab(label="Salesperson", value='salesperson', className="custom-tab", selected_className="custom-tab--selected", children=[
+                html.P(id='salesperson-progress', className="text-sm text-gray-500 mb-1"),
+                html.H2("Individual and Team Performance", className="text-base font-bold text-blue-800 mb-2"),
                 html.Div([
-                    html.H3("Top Performer", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='top-salesperson', className="text-base font-bold text-green-600")
-                ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Top Performer", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='top-salesperson', className="text-base font-bold text-green-600")
+                    ], className="kpi-card"),
+                    html.Div([
+                        html.H3("Underperformer", className="text-sm font-semibold text-gray-700"),
+                        html.P(id='low-salesperson', className="text-base font-bold text-red-600")
+                    ], className="kpi-card"),
+                ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
                 html.Div([
-                    html.H3("Underperformer", className="text-sm font-semibold text-gray-700"),
-                    html.P(id='low-salesperson', className="text-base font-bold text-red-600")
-                ], className="kpi-card"),
-            ], className="grid grid-cols-1 md:grid-cols-3 gap-2 mb-2"),
-            html.Div([
-                dcc.Graph(id='salesperson-bar', className="graph-card"),
-                dcc.Graph(id='salesperson-trend', className="graph-card")
-            ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
-        ]),
-    ])
-], className="dashboard-container")
+                    dcc.Graph(id='salesperson-bar', className="graph-card", figure=salesperson_bar_figure()),
+                    dcc.Graph(id='salesperson-trend', className="graph-card")
+                ], className="grid grid-cols-1 md:grid-cols-2 gap-2 mb-2"),
+            ]),
+        ])
+    ], className="dashboard-container")
 
 # Callbacks
-@app.callback(
+dash.clientside_callback(
+    "function(tab) { return window.innerWidth; }",
+    Output('viewport-width', 'data'),
+    Input('tabs', 'value')
+)
+
+dash.clientside_callback(
+    "function(live) { return !(live && live.length); }",
+    Output('live-interval', 'disabled'),
+    Input('live-mode', 'value')
+)
+
+@dash.callback(
     [
         Output('kpi-sales-gauge', 'figure'),
         Output('kpi-conversion-gauge', 'figure'),
         Output('kpi-growth-gauge', 'figure'),
         Output('team-status', 'children'),
         Output('total-sales', 'children'),
-        Output('sales-trend', 'figure'),
-        Output('region-pie', 'figure')
+        Output('region-pie', 'figure'),
+        Output('overview-rendered', 'data')
     ],
     [
         Input('date-picker', 'start_date'),
         Input('date-picker', 'end_date'),
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
-        Input('channel-filter', 'value')
+        Input('channel-filter', 'value'),
+        Input('live-mode', 'value'),
+        Input('live-interval', 'n_intervals'),
+        Input('tabs', 'value')
+    ],
+    [
+        State('overview-rendered', 'data')
     ]
 )
-def update_overview(start_date, end_date, region, salesperson, channel):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    sales = filtered_df['sales'].sum()
-    target = filtered_df['sales_target'].sum()
-    users = len(filtered_df)
-    conv_rate = (filtered_df['converted'].sum() / users * 100) if users > 0 else 0
-    filtered_df['year'] = filtered_df['date'].dt.year
-    sales_by_year = filtered_df.groupby('year')['sales'].sum().reset_index()
-    for year in sales_by_year['year']:
-        year_data = filtered_df[filtered_df['date'].dt.year == year]
-        days_in_year = 365 if year != 2025 else (pd.to_datetime(f'{year}-03-31') - pd.to_datetime(f'{year}-01-01')).days + 1
-        fraction_of_year = len(year_data['date'].dt.date.unique()) / days_in_year
-        if fraction_of_year > 0:
-            sales_by_year.loc[sales_by_year['year'] == year, 'sales'] /= fraction_of_year
-    growth = ((sales_by_year['sales'].pct_change() * 100).iloc[-1] if len(sales_by_year) > 1 else 0)
-    growth = max(5, min(100, growth))
-
-    # Gauge for Sales
-    sales_gauge = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=sales,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Sales ($)", 'font': {'size': 10}},
-        gauge={
-            'axis': {'range': [0, max(target * 1.2, sales * 1.2)]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, target * 0.8], 'color': "red"},
-                {'range': [target * 0.8, target], 'color': "yellow"},
-                {'range': [target, target * 1.2], 'color': "green"}
-            ],
-            'threshold': {
-                'line': {'color': "black", 'width': 4},
-                'thickness': 0.75,
-                'value': target
-            }
-        }
-    ))
-    sales_gauge.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8))
+@timed_callback
+@cached_tab('overview')
+def update_overview(start_date, end_date, region, salesperson, channel, live, n_intervals, active_tab, rendered):
+    inputs = [start_date, end_date, region, salesperson, channel, live, data_version()]
+    skip_tab_update('overview', active_tab, rendered, inputs)
+    if live:
+        end_date = latest_end_date(end_date)
+    filters = (start_date, end_date, region, salesperson, channel)
+    totals = cube_query('base', *filters)
+    daily = cube_query('base', *filters, by=['date', 'year'], measures=['sales'])
 
-    # Gauge for Conversion Rate
-    conv_gauge = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=conv_rate,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Conversion Rate (%)", 'font': {'size': 10}},
-        gauge={
-            'axis': {'range': [0, 10]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, 3], 'color': "red"},
-                {'range': [3, 5], 'color': "yellow"},
-                {'range': [5, 10], 'color': "green"}
-            ],
-            'threshold': {
-                'line': {'color': "black", 'width': 4},
-                'thickness': 0.75,
-                'value': 5 
-            }
-        }
-    ))
-    conv_gauge.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8))
+    sales = totals['sales']
+    target = totals['sales_target']
+    users = totals['rows']
+    conv_rate = (totals['converted'] / users * 100) if users > 0 else 0
+    growth = max(5, min(100, annualized_growth(daily)))
 
-    # Gauge for Growth
-    growth_gauge = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=growth,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Sales Growth (%)", 'font': {'size': 10}},
-        gauge={
-            'axis': {'range': [0, 20]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, 5], 'color': "red"},
-                {'range': [5, 10], 'color': "yellow"},
-                {'range': [10, 20], 'color': "green"}
-            ],
-            'threshold': {
-                'line': {'color': "black", 'width': 4},
-                'thickness': 0.75,
-                'value': 10  
-            }
-        }
-    ))
-    growth_gauge.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8))
+    # Gauges: only the values (and the sales target bands) change
+    sales_gauge = gauge_patch(sales, (target * 0.8, target, target * 1.2), max(target * 1.2, sales * 1.2))
+    conv_gauge = gauge_patch(conv_rate)
+    growth_gauge = gauge_patch(growth)
 
     # Team Status
     sales_performance = sales / target * 100 if target > 0 else 0
@@ -467,23 +2637,8 @@ def update_overview(start_date, end_date, region, salesperson, channel):
 
     total_sales_display = f"${sales:,.2f}"
 
-    sales_trend_data = filtered_df.groupby('date')['sales'].sum().reset_index()
-    sales_fig = px.line(sales_trend_data, x='date', y='sales', title="Sales Trend Over Time")
-    sales_fig.update_layout(
-        margin=dict(l=10, r=10, t=20, b=10),
-        font=dict(size=8),
-        title_font_size=10
-    )
-
-    region_data = filtered_df.groupby('region')['sales'].sum().reset_index()
-    pie_fig = px.pie(region_data, names='region', values='sales', title="Sales by Region")
-    pie_fig.update_traces(textinfo='percent+label', textfont_size=8)
-    pie_fig.update_layout(
-        margin=dict(l=10, r=10, t=20, b=10),
-        font=dict(size=8),
-        title_font_size=10
-    )
-
+    region_data = cube_query('base', *filters, by=['region'], measures=['sales'])
+    pie_fig = data_patch(**{'0.labels': region_data['region'], '0.values': region_data['sales']})
 
     return (
         sales_gauge,
@@ -491,16 +2646,66 @@ def update_overview(start_date, end_date, region, salesperson, channel):
         growth_gauge,
         html.P(team_status, className=f"text-base font-bold {team_color}"),
         total_sales_display,
-        sales_fig,
-        pie_fig
+        pie_fig,
+        inputs
     )
 
-@app.callback(
+@dash.callback(
+    [
+        Output('sales-trend', 'figure'),
+        Output('sales-trend-rendered', 'data')
+    ],
+    [
+        Input('date-picker', 'start_date'),
+        Input('date-picker', 'end_date'),
+        Input('region-filter', 'value'),
+        Input('salesperson-filter', 'value'),
+        Input('channel-filter', 'value'),
+        Input('exact-mode', 'value'),
+        Input('sales-trend', 'relayoutData'),
+        Input('live-mode', 'value'),
+        Input('live-interval', 'n_intervals'),
+        Input('tabs', 'value')
+    ],
+    [
+        State('viewport-width', 'data'),
+        State('sales-trend-rendered', 'data')
+    ]
+)
+@timed_callback
+def update_sales_trend(start_date, end_date, region, salesperson, channel, exact_mode, relayout, live, n_intervals, active_tab, viewport, rendered):
+    # rendered = filter inputs + [x range, data version]; new data alone only patches the traces
+    filter_inputs = [start_date, end_date, region, salesperson, channel, exact_mode, live]
+    previous = rendered[:-1] if rendered else None
+    x_range = zoomed_range(relayout if ctx.triggered_id == 'sales-trend' else None, previous, filter_inputs)
+    inputs = filter_inputs + [x_range, data_version()]
+    skip_tab_update('overview', active_tab, rendered, inputs)
+    if live:
+        end_date = latest_end_date(end_date)
+    filters = (start_date, end_date, region, salesperson, channel)
+
+    budget = trend_budget(viewport, 2, exact_mode)
+    series, granularity = trend_series(filters, x_range, [], budget)
+    traces = trend_traces(downsample(series, 'date', 'sales', budget), None, [None])
+    title = f"Sales Trend Over Time ({granularity})"
+    if previous and previous[:-1] == filter_inputs:
+        return trend_patch(traces, title), inputs
+
+    sales_fig = trend_figure(traces, [None], title, uirevision=str(filter_inputs))
+    sales_fig.update_layout(
+        margin=dict(l=10, r=10, t=20, b=10),
+        font=dict(size=8),
+        title_font_size=10
+    )
+    return sales_fig, inputs
+
+@dash.callback(
     [
         Output('top-product', 'children'),
         Output('low-product', 'children'),
         Output('profit-margin', 'children'),
-        Output('product-sales-chart', 'figure')
+        Output('product-sales-chart', 'figure'),
+        Output('products-rendered', 'data')
     ],
     [
         Input('date-picker', 'start_date'),
@@ -508,152 +2713,148 @@ def update_overview(start_date, end_date, region, salesperson, channel):
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
         Input('channel-filter', 'value'),
-        Input('product-dropdown', 'value')
+        Input('product-dropdown', 'value'),
+        Input('tabs', 'value')
+    ],
+    [
+        State('products-rendered', 'data')
     ]
 )
-def update_products(start_date, end_date, region, salesperson, channel, selected_product):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    sales_by_product = filtered_df.groupby('product').agg({'sales': 'sum', 'sales_target': 'sum'}).reset_index()
+@timed_callback
+@cached_tab('products')
+def update_products(start_date, end_date, region, salesperson, channel, selected_product, active_tab, rendered):
+    inputs = [start_date, end_date, region, salesperson, channel, selected_product, data_version()]
+    skip_tab_update('products', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
+    totals = cube_query('base', *filters, measures=['profit_margin', 'rows'])
+
+    sales_by_product = cube_query('product', *filters, by=['product'], measures=['sales', 'sales_target'])
     sales_by_product['performance'] = sales_by_product['sales'] / sales_by_product['sales_target'] * 100
     top_product = sales_by_product.loc[sales_by_product['sales'].idxmax(), 'product'] if not sales_by_product.empty else "N/A"
     low_product = sales_by_product.loc[sales_by_product['sales'].idxmin(), 'product'] if not sales_by_product.empty else "N/A"
-    avg_profit_margin = filtered_df['profit_margin'].mean().round(2) if not filtered_df.empty else 0
+    avg_profit_margin = round(totals['profit_margin'] / totals['rows'], 2) if totals['rows'] > 0 else 0
 
-    sales_fig = px.bar(
-        sales_by_product,
-        x='product',
-        y='sales',
-        title="Sales by Product",
-        color='product', 
-        color_discrete_sequence=px.colors.qualitative.Plotly  
-    )
-    sales_fig.update_layout(
-        margin=dict(l=10, r=10, t=20, b=10),
-        font=dict(size=8),
-        title_font_size=10,
-        xaxis_title="Product",
-        yaxis_title="sales",
-        xaxis_tickangle=45,  
-        showlegend=False  
-    )
+    product_sales = sales_by_product.set_index('product')['sales'].reindex(products, fill_value=0)
+    sales_fig = data_patch(**{f'{i}.y': [value] for i, value in enumerate(product_sales.tolist())})
 
     return (
         top_product,
         low_product,
         f"{avg_profit_margin:.2f}%",
-        sales_fig
+        sales_fig,
+        inputs
     )
 
-@app.callback(
+@dash.callback(
     [
         Output('choropleth-map', 'figure'),
         Output('region-bar', 'figure'),
-        Output('age-dist', 'figure')
+        Output('age-dist', 'figure'),
+        Output('regions-rendered', 'data')
     ],
-    [
+    tab_request('regions', [
         Input('date-picker', 'start_date'),
         Input('date-picker', 'end_date'),
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
-        Input('channel-filter', 'value')
-    ]
+        Input('channel-filter', 'value'),
+        Input('tabs', 'value')
+    ]),
+    [
+        State('regions-rendered', 'data')
+    ],
+    **background_options('regions')
 )
-def update_regions(start_date, end_date, region, salesperson, channel):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    choropleth_fig = px.choropleth(
-        filtered_df.groupby('country')['sales'].sum().reset_index(),
-        locations='country', locationmode='country names', color='sales',
-        title='Sales by Country', color_continuous_scale='Viridis'
-    )
-    choropleth_fig.update_layout(
-        margin=dict(l=10, r=10, t=20, b=10),
-        font=dict(size=8),
-        title_font_size=10
-    )
+@timed_callback
+@cached_tab('regions')
+def update_regions(request, start_date, end_date, region, salesperson, channel, active_tab, rendered):
+    inputs = [start_date, end_date, region, salesperson, channel, data_version()]
+    skip_tab_update('regions', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
 
-    region_kpis = filtered_df.groupby('region').agg({'sales': 'sum'}).reset_index()
-    region_bar_fig = px.bar(region_kpis, x='region', y='sales', title="Sales Comparison by Region")
-    region_bar_fig.update_layout(
-        margin=dict(l=10, r=10, t=20, b=10),
-        font=dict(size=8),
-        title_font_size=10
-    )
+    country_sales = cube_query('country', *filters, by=['country'], measures=['sales'])
+    choropleth_fig = data_patch(**{'0.locations': country_sales['country'], '0.z': country_sales['sales']})
 
-    age_dist_fig = px.histogram(filtered_df, x='age_group', y='sales', color='region', title="Sales by Age Group and Region", barmode='group')
+    region_kpis = cube_query('base', *filters, by=['region'], measures=['sales'])
+    region_bar_fig = data_patch(**{'0.x': region_kpis['region'], '0.y': region_kpis['sales']})
+
+    age_sales = cube_query('age_group', *filters, by=['age_group', 'region'], measures=['sales'])
+    age_dist_fig = binned_bar(age_sales, x='age_group', y='sales', color='region', title="Sales by Age Group and Region", barmode='group')
     age_dist_fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
 
     return (
         choropleth_fig,
         region_bar_fig,
-        age_dist_fig
+        age_dist_fig,
+        inputs
     )
 
-@app.callback(
+@dash.callback(
     [
         Output('dau', 'children'),
         Output('session-duration', 'children'),
         Output('retention', 'children'),
         Output('engagement-trend', 'figure'),
         Output('engagement-funnel', 'figure'),
-        Output('cohort-analysis', 'figure')
+        Output('cohort-analysis', 'figure'),
+        Output('engagement-rendered', 'data')
     ],
-    [
+    tab_request('engagement', [
         Input('date-picker', 'start_date'),
         Input('date-picker', 'end_date'),
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
         Input('channel-filter', 'value'),
-        Input('engagement-segment', 'value')
-    ]
+        Input('engagement-segment', 'value'),
+        Input('exact-mode', 'value'),
+        Input('tabs', 'value')
+    ]),
+    [
+        State('viewport-width', 'data'),
+        State('engagement-rendered', 'data')
+    ],
+    **background_options('engagement')
 )
-def update_engagement(start_date, end_date, region, salesperson, channel, segment):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    if segment != 'All':
-        filtered_df = filtered_df.groupby([segment, 'date']).sum().reset_index()
-
-    dau = filtered_df.groupby('date')['user_engagement'].count().mean()
-    session_duration = filtered_df['session_duration'].mean()
-    retention = (filtered_df['user_engagement'] > 5).mean() * 100  # Adjusted threshold
+@timed_callback
+@cached_tab('engagement')
+def update_engagement(request, start_date, end_date, region, salesperson, channel, segment, exact_mode, active_tab, viewport, rendered):
+    inputs = [start_date, end_date, region, salesperson, channel, segment, exact_mode, data_version()]
+    skip_tab_update('engagement', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
+
+    if segment == 'All':
+        daily = cube_query('base', *filters, by=['date'], measures=['user_engagement', 'session_duration', 'engaged', 'rows'])
+        users = daily['rows'].sum()
+        dau = daily['rows'].mean()
+        session_duration = daily['session_duration'].sum() / users if users > 0 else np.nan
+        retention = daily['engaged'].sum() / users * 100 if users > 0 else np.nan  # Adjusted threshold
+    else:
+        # Segmented KPIs are computed over per-(segment, date) totals
+        segment_df = cube_query(cube_view(segment), *filters, by=[segment, 'date'], measures=['user_engagement', 'session_duration'])
+        dau = segment_df.groupby('date')['user_engagement'].count().mean()
+        session_duration = segment_df['session_duration'].mean()
+        retention = (segment_df['user_engagement'] > 5).mean() * 100
+        daily = segment_df.groupby('date')['user_engagement'].sum().reset_index()
 
     trend_fig = px.line(
-        filtered_df.groupby('date')['user_engagement'].sum().reset_index(),
+        downsample(daily[['date', 'user_engagement']], 'date', 'user_engagement', trend_budget(viewport, 3, exact_mode)),
         x='date',
         y='user_engagement',
         title="User Engagement Over Time"
     )
+    typed_dates(trend_fig)
     trend_fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
 
     funnel_fig = px.funnel(
-        filtered_df.groupby('job_title')['user_engagement'].sum().nlargest(5).reset_index(),
+        cube_query('job_title', *filters, by=['job_title'], measures=['user_engagement']).nlargest(5, 'user_engagement'),
         x='user_engagement',
         y='job_title',
         title="Top 5 Job Titles by Engagement"
     )
     funnel_fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
 
-    cohort_fig = px.density_heatmap(
-        filtered_df.groupby(['month', 'region'])['user_engagement'].sum().reset_index(),
+    cohort_fig = binned_heatmap(
+        cube_query('base', *filters, by=['month', 'region'], measures=['user_engagement']),
         x='month',
         y='region',
         z='user_engagement',
@@ -667,64 +2868,71 @@ def update_engagement(start_date, end_date, region, salesperson, channel, segmen
         f"{retention:.2f}%",
         trend_fig,
         funnel_fig,
-        cohort_fig
+        cohort_fig,
+        inputs
     )
 
-@app.callback(
+@dash.callback(
     [
         Output('promo-redemptions', 'children'),
         Output('promo-roi', 'children'),
         Output('promo-performance', 'figure'),
         Output('promo-correlation', 'figure'),
-        Output('promo-form-output', 'children')
+        Output('promo-windows', 'figure'),
+        Output('promotions-rendered', 'data')
     ],
-    [
+    tab_request('promotions', [
         Input('date-picker', 'start_date'),
         Input('date-picker', 'end_date'),
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
         Input('channel-filter', 'value'),
-        Input('add-promo-button', 'n_clicks')
-    ],
+        Input('promo-registry', 'data'),
+        Input('exact-mode', 'value'),
+        Input('tabs', 'value')
+    ], versions=(promotions_revision, data_version)),
     [
-        State('input-promo', 'value'),
-        State('promo-start', 'date'),
-        State('promo-end', 'date'),
-        State('input-target', 'value'),
-        State('input-channel', 'value')
-    ]
+        State('viewport-width', 'data'),
+        State('promotions-rendered', 'data')
+    ],
+    **background_options('promotions')
 )
-def update_promotions(start_date, end_date, region, salesperson, channel, add_clicks, input_promo, promo_start, promo_end, input_target, input_channel):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    global promotion_data
-    redemptions = filtered_df.groupby('promo_event')['quantity'].sum().sum()
-    roi = filtered_df[filtered_df['promo_event'] != 'None']['sales'].mean() / filtered_df['sales'].mean() * 100 if filtered_df['sales'].mean() > 0 else 0
+@timed_callback
+@cached_tab('promotions', versions=(data_version, promotions_revision))
+def update_promotions(request, start_date, end_date, region, salesperson, channel, registry, exact_mode, active_tab, viewport, rendered):
+    # The registry revision is read from the database: promotions added through another worker show up too
+    inputs = [start_date, end_date, region, salesperson, channel, registry, exact_mode, promotions_revision(), data_version()]
+    skip_tab_update('promotions', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
+    by_promo = cube_query('promo_event', *filters, by=['promo_event'], measures=['sales', 'quantity', 'rows'])
+    redemptions = by_promo['quantity'].sum()
+    promoted = by_promo[by_promo['promo_event'] != 'None']
+    mean_sales = by_promo['sales'].sum() / by_promo['rows'].sum() if by_promo['rows'].sum() > 0 else 0
+    promo_mean_sales = promoted['sales'].sum() / promoted['rows'].sum() if promoted['rows'].sum() > 0 else 0
+    roi = promo_mean_sales / mean_sales * 100 if mean_sales > 0 else 0
 
+    promo_trend = cube_query('promo_event', *filters, by=['date', 'promo_event'], measures=['sales'])
     performance_fig = px.line(
-        filtered_df.groupby(['date', 'promo_event'])['sales'].sum().reset_index(),
+        downsample(promo_trend, 'date', 'sales', trend_budget(viewport, 2, exact_mode), color='promo_event'),
         x='date',
         y='sales',
         color='promo_event',
         title="Sales by Promotion"
     )
+    typed_dates(performance_fig)
     performance_fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
 
     # Box plot for correlation analysis between sales and promotional events
-    correlation_fig = px.box(
-        filtered_df[filtered_df['sales'] > 0],
-        x='promo_event',
-        y='sales',
-        color='promo_event',
-        title="Sales Distribution by Promotional Event",
-        points="outliers"
-    )
+    if QUERY_ENGINE == 'duckdb':
+        promo_stats = duckdb_box_stats(filters)
+    else:
+        rows = filter_rows(*filters)
+        df = current_data()['frame']
+        sales_values = df['sales'].to_numpy()[rows]
+        converted = sales_values > 0
+        promo_stats = box_stats(sales_values[converted], df['promo_event'].cat.codes.to_numpy()[rows][converted],
+                                df['promo_event'].cat.categories)
+    correlation_fig = box_figure(promo_stats, "Sales Distribution by Promotional Event")
     correlation_fig.update_layout(
         margin=dict(l=10, r=10, t=20, b=10),
         font=dict(size=8),
@@ -733,122 +2941,378 @@ def update_promotions(start_date, end_date, region, salesperson, channel, add_cl
         xaxis_title="Promotional Event",
         yaxis_title="Sales ($)"
     )
-    form_message = ""
-    if add_clicks > 0 and input_promo and promo_start and promo_end and input_target and input_channel:
-        if input_promo not in [p['promo_event'] for p in promotion_data]:
-            promotion_data.append({
-                'promo_event': input_promo,
-                'start_date': promo_start,
-                'end_date': promo_end,
-                'target': input_target,
-                'redemption_rate': random.uniform(0.1, 0.5),
-                'channel': input_channel
-            })
-            form_message = f"Added promotion: {input_promo} for {input_channel}"
-        else:
-            form_message = "Promotion already exists!"
+    promotions = find_promotions(channel=channel, start_date=start_date, end_date=end_date)
+    windows_fig = promotion_windows_figure(promotion_window_sales(promotions, filters))
 
     return (
         f"{int(redemptions)}",
         f"{roi:.2f}%",
         performance_fig,
         correlation_fig,
-        form_message
+        windows_fig,
+        inputs
     )
 
-@app.callback(
+@dash.callback(
+    [
+        Output('promo-form-output', 'children'),
+        Output('promo-registry', 'data')
+    ],
+    [
+        Input('add-promo-button', 'n_clicks')
+    ],
+    [
+        State('input-promo', 'value'),
+        State('promo-start', 'date'),
+        State('promo-end', 'date'),
+        State('input-target', 'value'),
+        State('input-channel', 'value')
+    ]
+)
+@timed_callback
+def add_promotion(add_clicks, input_promo, promo_start, promo_end, input_target, input_channel):
+    if not add_clicks or not (input_promo and promo_start and promo_end and input_target and input_channel):
+        raise PreventUpdate
+    if promo_end < promo_start:
+        return "The end date is before the start date!", dash.no_update
+    added = add_promotions([{
+        'promo_event': input_promo,
+        'start_date': promo_start[:10],
+        'end_date': promo_end[:10],
+        'target': input_target,
+        'channel': input_channel,
+        'redemption_rate': random.uniform(0.1, 0.5)
+    }])
+    if not added:
+        return "Promotion already exists!", dash.no_update
+    return f"Added promotion: {input_promo} for {input_channel}", promotions_revision()
+
+@dash.callback(
     [
         Output('log-table', 'data'),
+        Output('log-table', 'page_count'),
+        Output('log-count', 'children'),
+        Output('logs-rendered', 'data')
     ],
     [
         Input('date-picker', 'start_date'),
         Input('date-picker', 'end_date'),
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
-        Input('channel-filter', 'value')
+        Input('channel-filter', 'value'),
+        Input('log-table', 'page_current'),
+        Input('log-table', 'page_size'),
+        Input('log-table', 'sort_by'),
+        Input('log-table', 'filter_query'),
+        Input('tabs', 'value')
+    ],
+    [
+        State('logs-rendered', 'data')
     ]
 )
-def update_logs(start_date, end_date, region, salesperson, channel):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    log_data = filtered_df[['date', 'country', 'salesperson', 'marketing_channel', 'details']].sort_values(by='date', ascending=False)
-    table_data = log_data.to_dict('records')
+@timed_callback
+@cached_tab('logs')
+def update_logs(start_date, end_date, region, salesperson, channel, page_current, page_size, sort_by, filter_query, active_tab, rendered):
+    inputs = [start_date, end_date, region, salesperson, channel, page_current, page_size, sort_by, filter_query, data_version()]
+    skip_tab_update('logs', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
+    table_data, total = log_page(filters, page_current or 0, page_size, sort_by, filter_query)
+    page_count = max(1, -(-total // page_size))
 
     return (
         table_data,
+        page_count,
+        f"{total:,} log entries",
+        inputs
     )
 
-@app.callback(
+@dash.callback(
     [
         Output('top-salesperson', 'children'),
         Output('low-salesperson', 'children'),
         Output('salesperson-bar', 'figure'),
-        Output('salesperson-trend', 'figure')
+        Output('salesperson-rendered', 'data')
     ],
-    [
+    tab_request('salesperson', [
         Input('date-picker', 'start_date'),
         Input('date-picker', 'end_date'),
         Input('region-filter', 'value'),
         Input('salesperson-filter', 'value'),
-        Input('channel-filter', 'value')
-    ]
+        Input('channel-filter', 'value'),
+        Input('tabs', 'value')
+    ]),
+    [
+        State('salesperson-rendered', 'data')
+    ],
+    **background_options('salesperson')
 )
-def update_salesperson(start_date, end_date, region, salesperson, channel):
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    if region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == region]
-    if salesperson != 'All':
-        filtered_df = filtered_df[filtered_df['salesperson'] == salesperson]
-    if channel != 'All':
-        filtered_df = filtered_df[filtered_df['marketing_channel'] == channel]
-
-    sales_by_person = filtered_df.groupby('salesperson').agg({'sales': 'sum', 'sales_target': 'sum'}).reset_index()
+@timed_callback
+@cached_tab('salesperson')
+def update_salesperson(request, start_date, end_date, region, salesperson, channel, active_tab, rendered):
+    inputs = [start_date, end_date, region, salesperson, channel, data_version()]
+    skip_tab_update('salesperson', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
+
+    sales_by_person = cube_query('base', *filters, by=['salesperson'], measures=['sales', 'sales_target'])
     sales_by_person['performance'] = sales_by_person['sales'] / sales_by_person['sales_target'] * 100
     top_salesperson = sales_by_person.loc[sales_by_person['sales'].idxmax(), 'salesperson'] if not sales_by_person.empty else "N/A"
     low_salesperson = sales_by_person.loc[sales_by_person['sales'].idxmin(), 'salesperson'] if not sales_by_person.empty else "N/A"
 
     # Bar Chart for Team Performance
-    bar_fig = px.bar(
-        sales_by_person,
-        x='salesperson',
-        y='sales',
-        title="Sales by Salesperson vs Target",
-        color_discrete_sequence=['blue']
-    )
-    bar_fig.add_scatter(x=sales_by_person['salesperson'], y=sales_by_person['sales_target'], mode='markers', name='Target', marker=dict(color='red', size=10, symbol='x'))
-    bar_fig.update_traces(marker_color=['green' if p >= 100 else 'yellow' if p >= 80 else 'red' for p in sales_by_person['performance']])
-    bar_fig.update_layout(
-        margin=dict(l=10, r=10, t=20, b=10),
-        font=dict(size=8),
-        title_font_size=10,
-        xaxis_title="Salesperson",
-        yaxis_title="Sales ($)",
-        xaxis_tickangle=45
-    )
-
-    # Trend by Salesperson
-    trend_data = filtered_df.groupby(['date', 'salesperson'])['sales'].sum().reset_index()
-    trend_fig = px.line(
-        trend_data,
-        x='date',
-        y='sales',
-        color='salesperson',
-        title="Sales Trends by Salesperson"
-    )
-    trend_fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
+    marker_color = ['green' if p >= 100 else 'yellow' if p >= 80 else 'red' for p in sales_by_person['performance']]
+    bar_fig = data_patch(**{
+        '0.x': sales_by_person['salesperson'], '0.y': sales_by_person['sales'], '0.marker.color': marker_color,
+        '1.x': sales_by_person['salesperson'], '1.y': sales_by_person['sales_target'], '1.marker.color': marker_color
+    })
 
     return (
         top_salesperson,
         low_salesperson,
         bar_fig,
-        trend_fig
+        inputs
     )
 
+@dash.callback(
+    [
+        Output('salesperson-trend', 'figure'),
+        Output('salesperson-trend-rendered', 'data')
+    ],
+    [
+        Input('date-picker', 'start_date'),
+        Input('date-picker', 'end_date'),
+        Input('region-filter', 'value'),
+        Input('salesperson-filter', 'value'),
+        Input('channel-filter', 'value'),
+        Input('exact-mode', 'value'),
+        Input('salesperson-trend', 'relayoutData'),
+        Input('tabs', 'value')
+    ],
+    [
+        State('viewport-width', 'data'),
+        State('salesperson-trend-rendered', 'data')
+    ]
+)
+@timed_callback
+def update_salesperson_trend(start_date, end_date, region, salesperson, channel, exact_mode, relayout, active_tab, viewport, rendered):
+    # rendered = filter inputs + [x range, data version]
+    filter_inputs = [start_date, end_date, region, salesperson, channel, exact_mode]
+    previous = rendered[:-1] if rendered else None
+    x_range = zoomed_range(relayout if ctx.triggered_id == 'salesperson-trend' else None, previous, filter_inputs)
+    inputs = filter_inputs + [x_range, data_version()]
+    skip_tab_update('salesperson', active_tab, rendered, inputs)
+    filters = (start_date, end_date, region, salesperson, channel)
+
+    # Trend by Salesperson
+    budget = trend_budget(viewport, 2, exact_mode)
+    names = [salesperson] if salesperson != 'All' else salespersons
+    series, granularity = trend_series(filters, x_range, ['salesperson'], budget)
+    series = downsample(series, 'date', 'sales', budget, color='salesperson')
+    traces = trend_traces(series, 'salesperson', names)
+    title = f"Sales Trends by Salesperson ({granularity})"
+    if previous and previous[:-1] == filter_inputs:
+        return trend_patch(traces, title), inputs
+
+    trend_fig = trend_figure(traces, names, title, uirevision=str(filter_inputs))
+    trend_fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), font=dict(size=8), title_font_size=10)
+    return trend_fig, inputs
+
+@dash.callback(
+    [
+        Output('upload-status', 'children'),
+        Output('upload-interval', 'disabled')
+    ],
+    [
+        Input('upload-data', 'contents'),
+        Input('upload-interval', 'n_intervals')
+    ],
+    [
+        State('upload-data', 'filename')
+    ]
+)
+@timed_callback
+def update_upload(contents, n_intervals, filename):
+    if ctx.triggered_id is None:
+        raise PreventUpdate
+    if ctx.triggered_id == 'upload-data':
+        if not filename.lower().endswith(UPLOAD_FORMATS):
+            return f"Upload a {' or '.join(UPLOAD_FORMATS)} file", True
+        if len(contents) * 3 / 4 > UPLOAD_MAX_MB * 1024 * 1024:  # the browser checks too; other clients may not
+            return f"{filename} is over {UPLOAD_MAX_MB:g} MB: import it with `python dashboard.py import`", True
+        start_upload(contents, filename)
+    status = read_upload_status()
+    return upload_message(status), status['state'] != 'running'
+
+# App configuration
+# create_app() takes any of these keys; the defaults come from the DASHBOARD_* environment variables read above.
+DEFAULT_CONFIG = {
+    'num_rows': num_rows,
+    'data_dir': DATA_DIR,
+    'dataset_format': DATASET_FORMAT,
+    'query_engine': QUERY_ENGINE,
+    'pool_workers': POOL_WORKERS,
+    'report_payloads': REPORT_PAYLOADS,
+    'result_cache_mb': RESULT_CACHE_MB,
+    'prewarm': os.environ.get('DASHBOARD_PREWARM', '0') == '1',
+}
+
+def configure(config=None):
+    global num_rows, DATA_DIR, DATASET_FORMAT, QUERY_ENGINE, POOL_WORKERS, REPORT_PAYLOADS, RESULT_CACHE_MB, DATASET_VERSION
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    if DATA is not None and (config['num_rows'], config['data_dir']) != (num_rows, DATA_DIR):
+        raise RuntimeError("The dataset is already loaded; configure() must run before the first request")
+    num_rows = config['num_rows']
+    DATA_DIR = config['data_dir']
+    DATASET_FORMAT = config['dataset_format']
+    QUERY_ENGINE = config['query_engine']
+    POOL_WORKERS = config['pool_workers']
+    REPORT_PAYLOADS = config['report_payloads']
+    RESULT_CACHE_MB = config['result_cache_mb']
+    DATASET_VERSION = dataset_key(num_rows)
+    return config
+
+# App factory
+# Importing this module only defines functions and registers the callbacks (dash.callback); create_app() builds the
+# Dash app and its layout from the stored metadata, and the dataset itself is loaded by the first callback request,
+# which also starts the process's part watcher.
+def load_data_for_callbacks():
+    if flask.request.path.endswith('/_dash-update-component'):
+        ensure_data()
+        start_part_watcher()
+
+def cache_stats_view():
+    return flask.jsonify(result_cache_stats())
+
+def create_app(config=None):
+    config = configure(config)
+    meta = load_metadata()
+    app = dash.Dash(__name__, external_stylesheets=[
+        'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
+        '/assets/styles.css'
+    ], background_callback_manager=background_manager())
+    app.title = "AI-Solutions Sales Dashboard"
+    app.layout = build_layout(meta)
+    app.server.before_request(load_data_for_callbacks)
+    app.server.add_url_rule('/_cache-stats', 'cache_stats', cache_stats_view)
+    setup_response_encoding(app.server)
+    if config['prewarm']:
+        prewarm(app)
+    return app
+
+def create_server(config=None):
+    # WSGI entry point: gunicorn "dashboard:create_server()"
+    return create_app(config).server
+
+# Pre-warm
+# Renders the default view of every tab (the layout's initial filter values) through the callback endpoint, so the
+# result cache holds them before the first user arrives. create_app() runs it when DASHBOARD_PREWARM=1; with several
+# workers, `python dashboard.py warm` before starting them (or gunicorn --preload) computes everything once.
+def layout_values(layout):
+    return {(component.id, prop): getattr(component, prop, None)
+            for component in layout._traverse() if getattr(component, 'id', None) is not None
+            for prop in component._prop_names}
+
+def prewarm(app):
+    started = time.perf_counter()
+    before = result_cache_stats()
+    app.server.test_client().get('/')  # Dash fills app.callback_map on its first request
+    values = layout_values(app.layout)
+    # Server-side callbacks that depend on the active tab (clientside ones have no 'callback'). The background tabs read
+    # it as a State and, like their gates, are only requested for their own tab
+    gates = {f'{tab}-request': tab for tab in BACKGROUND_TABS}
+    outputs = [(output, gates.get(spec['inputs'][0]['id'])) for output, spec in app.callback_map.items()
+               if 'callback' in spec
+               and any((dep['id'], dep['property']) == ('tabs', 'value') for dep in spec['inputs'] + spec['state'])]
+    for tab in TABS:
+        for output, own_tab in outputs:
+            if own_tab in (None, tab):
+                callback_request(app, output, {**values, ('tabs', 'value'): tab})
+    # Background jobs read and write the cache in their own processes, so only the entries add up here
+    after = result_cache_stats()
+    print(f"Pre-warmed {len(TABS)} tabs in {time.perf_counter() - started:.2f}s: "
+          f"{after['entries'] - before['entries']} results added, "
+          f"{after['entries']} entries ({after['mb']:.1f} MB) in the result cache")
+
+# Startup benchmark
+# Times a cold import of this module in a fresh interpreter, create_app(), and the first (dataset-loading) and a
+# second overview callback request through the Flask test client.
+def callback_request(app, output_id, values):
+    output = next(key for key in app.callback_map if f'.{output_id}.' in f'.{key}.')
+    spec = app.callback_map[output]
+    body = {
+        'output': output,
+        'outputs': [dict(zip(['id', 'property'], part.rsplit('.', 1))) for part in output.strip('.').split('...')],
+        'inputs': [dict(dep, value=values.get((dep['id'], dep['property']))) for dep in spec['inputs']],
+        'state': [dict(dep, value=values.get((dep['id'], dep['property']))) for dep in spec['state']],
+        'changedPropIds': ['tabs.value'],
+    }
+    started = time.perf_counter()
+    client = app.server.test_client()
+    response = client.post('/_dash-update-component', json=body)
+    seconds = time.perf_counter() - started
+    job = response.get_json(silent=True) if response.status_code == 200 else None
+    if job and 'job' in job:
+        # A background callback answers with a job handle: poll it like the browser does until the job has finished
+        handle = {'cacheKey': job['cacheKey'], 'job': job['job']}
+        while True:
+            response = client.post('/_dash-update-component', query_string=handle, json=body)
+            if response.status_code != 200 or 'response' in response.get_json(silent=True):
+                break
+            time.sleep(BACKGROUND_POLL_MS / 1000)
+        seconds = time.perf_counter() - started
+    return response.status_code, seconds
+
+def benchmark(config=None):
+    import subprocess
+    import sys
+    code = "import time; started = time.perf_counter(); import dashboard; print(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    import_seconds = float(result.stdout.split()[-1])
+
+    started = time.perf_counter()
+    app = create_app(config)
+    app.server.test_client().get('/')
+    app_seconds = time.perf_counter() - started
+    meta = load_metadata()
+    values = {
+        ('date-picker', 'start_date'): meta['min_date'],
+        ('date-picker', 'end_date'): meta['max_date'],
+        ('region-filter', 'value'): 'All',
+        ('salesperson-filter', 'value'): 'All',
+        ('channel-filter', 'value'): 'All',
+        ('tabs', 'value'): 'overview',
+    }
+    first_status, first_seconds = callback_request(app, 'kpi-sales-gauge.figure', values)
+    warm_status, warm_seconds = callback_request(app, 'kpi-sales-gauge.figure', values)
+    print(f"import: {import_seconds:.2f}s")
+    print(f"create_app + index page: {app_seconds:.2f}s")
+    print(f"first callback (loads the dataset): {first_seconds:.2f}s [{first_status}]")
+    print(f"warm callback: {warm_seconds * 1000:.0f} ms [{warm_status}]")
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    if command == 'build':
+        # Offline build: generate (or reuse) the dataset, write its metadata and, in arrow mode, the mapped files
+        configure()
+        ensure_data()
+        close_pool()
+    elif command == 'bench':
+        benchmark()
+    elif command == 'ingest':
+        run_ingest(sys.argv[2])
+    elif command == 'warm':
+        create_app({'prewarm': True})
+    elif command == 'cache-stats':
+        configure()
+        print(json.dumps(result_cache_stats(), indent=2))
+    elif command == 'import':
+        configure()
+        status = import_file(sys.argv[2])
+        print(upload_message(status))
+        sys.exit(0 if status['state'] == 'done' else 1)
+    elif command == 'compare-engines':
+        configure({'query_engine': 'pandas'})  # loads the frame, which every engine can query
+        sys.exit(0 if compare_engines(sys.argv[2:] or ('pandas', 'duckdb')) else 1)
+    else:
+        create_app().run(debug=True)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+
+# Small enough to generate in a couple of seconds, large enough to have rows on every day of the date range
+TEST_ROWS = 20000
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    # The dashboard keeps its data in module globals, so the whole session shares one dataset in a temporary directory
+    dashboard.configure({'num_rows': TEST_ROWS, 'data_dir': str(tmp_path_factory.mktemp('data')),
+                         'report_payloads': False})
+    dashboard.ensure_data()
+    return dashboard
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+START, END = '2023-01-10', '2023-04-20'
+
+
+def expected(dataset, region, salesperson, channel, by, measures):
+    frame = dataset.DATA['frame']
+    rows = frame[(frame['date'] >= START) & (frame['date'] < pd.Timestamp(END) + pd.Timedelta(days=1))]
+    for col, value in [('region', region), ('salesperson', salesperson), ('marketing_channel', channel)]:
+        if value != 'All':
+            rows = rows[rows[col] == value]
+    facts = rows.assign(date=rows['date'].dt.normalize(), rows=1)
+    return facts.groupby(by, observed=True, sort=True)[measures].sum().reset_index()
+
+
+@pytest.mark.parametrize('filters', [('All', 'All', 'All'), ('East Africa', 'All', 'All'),
+                                     ('All', 'John Doe', 'Email'), ('North Africa', 'Jane Smith', 'All')])
+@pytest.mark.parametrize('view, by, measures', [
+    ('base', ['date'], ['sales', 'rows']),
+    ('base', ['month', 'region'], ['sales', 'cost']),
+    ('country', ['country'], ['sales', 'rows']),
+    ('product', ['product'], ['sales', 'sales_target']),
+    ('job_title', ['job_title', 'date'], ['user_engagement']),
+])
+def test_cube_query_matches_raw_rows(dataset, filters, view, by, measures):
+    result = dataset.pandas_cube_query(view, START, END, *filters, by=by, measures=measures)
+    reference = expected(dataset, *filters, by, measures)
+    assert len(result) == len(reference)
+    for col in by:
+        assert list(result[col].astype(str)) == list(reference[col].astype(str))
+    for measure in measures:
+        assert np.allclose(result[measure].to_numpy(dtype=float), reference[measure].to_numpy(dtype=float))
+
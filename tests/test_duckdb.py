@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+FILTERS = [('2023-01-10', '2023-04-20', 'All', 'All', 'All'), ('2024-02-01', '2024-02-29', 'All', 'All', 'Email')]
+
+
+def test_snapshot_matches_the_frame(dataset):
+    data = dataset.current_data()
+    path = dataset.dataset_path(dataset.num_rows, data_dir=dataset.DATA_DIR)
+    snapshot, _ = dataset.duckdb_snapshot([path])
+    for key in ('rows', 'base_date', 'last_date'):
+        assert snapshot[key] == data[key]
+    assert snapshot['dtypes'] == {col: data['dtypes'][col] for col in snapshot['dtypes']}
+    assert dataset.duckdb_metadata(path) == dataset.frame_metadata(data['frame'])
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('filter_query', ['', '{details} contains "Mobile App"', '{date} ge 2023-02 && {country} < L'])
+@pytest.mark.parametrize('sort_by', [[], [{'column_id': 'country', 'direction': 'asc'}]])
+def test_log_page_matches_pandas(dataset, filters, filter_query, sort_by):
+    expected_rows, expected_total = dataset.log_page(list(filters), 2, 10, sort_by, filter_query)
+    sort_key = (sort_by[0]['column_id'], sort_by[0]['direction']) if sort_by else ('date', 'desc')
+    rows, total = dataset.duckdb_log_page(list(filters), 2, 10, sort_key, filter_query)
+    assert total == expected_total
+    assert rows == expected_rows
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_box_stats_match_pandas(dataset, filters):
+    frame = dataset.current_data()['frame']
+    rows = dataset.filter_rows(*filters)
+    sales = frame['sales'].to_numpy()[rows]
+    codes = frame['promo_event'].cat.codes.to_numpy()[rows]
+    expected = dataset.box_stats(sales[sales > 0], codes[sales > 0], frame['promo_event'].cat.categories)
+    stats = dataset.duckdb_box_stats(filters)
+    assert [group['group'] for group in stats] == [group['group'] for group in expected]
+    for group, expected_group in zip(stats, expected):
+        for key in ('q1', 'median', 'q3', 'lowerfence', 'upperfence', 'count'):
+            assert np.isclose(group[key], expected_group[key])
+        assert np.allclose(group['outliers'], expected_group['outliers'])
+
+
+def test_hourly_trend_matches_pandas(dataset, monkeypatch):
+    filters = ('2023-01-01', '2023-01-04', 'All', 'All', 'All')
+    expected, _ = dataset.trend_series(filters, None, ['salesperson'], None)
+    monkeypatch.setattr(dataset, 'QUERY_ENGINE', 'duckdb')
+    series, granularity = dataset.trend_series(filters, None, ['salesperson'], None)
+    assert granularity == 'hour'
+    pd.testing.assert_frame_equal(series, expected, check_dtype=False)
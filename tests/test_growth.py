@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from dashboard import annualized_growth
+
+
+def daily(start, end, sales_per_day):
+    dates = pd.date_range(start, end)
+    return pd.DataFrame({'year': dates.year, 'sales': [sales_per_day(date) for date in dates]})
+
+
+def test_partial_year_is_annualized():
+    # Same daily sales over a full year and the first quarter of the next: no growth
+    assert annualized_growth(daily('2022-01-01', '2023-03-31', lambda date: 10.0)) == pytest.approx(0.0)
+
+
+def test_partial_year_growth():
+    sales = daily('2022-01-01', '2023-06-30', lambda date: 10.0 if date.year == 2022 else 15.0)
+    assert annualized_growth(sales) == pytest.approx(50.0)
+
+
+def test_leap_year_has_366_days():
+    # 2024 has one more day than 2023, so flat daily sales grow its total by 1/365
+    assert annualized_growth(daily('2023-01-01', '2024-12-31', lambda date: 10.0)) == pytest.approx(100 / 365)
+    # A partial leap year is annualized over 366 days
+    assert annualized_growth(daily('2023-01-01', '2024-02-29', lambda date: 10.0)) == pytest.approx(100 / 365)
+
+
+def test_multi_year_span_compares_the_last_two_years():
+    sales = daily('2021-01-01', '2023-09-30', lambda date: {2021: 5.0, 2022: 10.0, 2023: 12.0}[date.year])
+    assert annualized_growth(sales) == pytest.approx(20.0)
+
+
+def test_days_without_data_are_not_counted():
+    sales = daily('2022-01-01', '2023-12-31', lambda date: 10.0)
+    sparse = sales[(sales['year'] == 2022) | (pd.RangeIndex(len(sales)) % 2 == 0)]
+    assert annualized_growth(sparse) == pytest.approx(0.0)
+
+
+def test_empty_and_single_year_input():
+    assert annualized_growth(pd.DataFrame({'year': pd.Series(dtype=int), 'sales': pd.Series(dtype=float)})) == 0.0
+    assert annualized_growth(daily('2023-01-01', '2023-12-31', lambda date: 10.0)) == 0.0
+
+
+def test_zero_sales_in_the_previous_year():
+    assert annualized_growth(daily('2022-01-01', '2023-12-31', lambda date: 0.0 if date.year == 2022 else 10.0)) == 0.0
+    assert annualized_growth(daily('2022-01-01', '2023-12-31', lambda date: 10.0 if date.year == 2022 else 0.0)) == \
+        pytest.approx(-100.0)
@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def write_events(path, events):
+    with open(path, 'w') as f:
+        for record in events.to_dict('records'):
+            f.write(json.dumps(record) + '\n')
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'duckdb', 'pool'])
+def test_ingested_events_are_aggregated_by_day(dataset, tmp_path_factory, engine):
+    if not dataset.DATA['parts']:
+        # Events on the three days after the last one, at times spread over the day
+        last_day = dataset.DATA['frame']['date'].iloc[-1].normalize()
+        events = dataset.generate_weblog(600, seed=7)
+        position = np.arange(len(events))
+        events['date'] = (last_day + pd.to_timedelta(position % 3 + 1, unit='D')
+                          + pd.to_timedelta(position * 97 % 86400, unit='s')).strftime('%Y-%m-%dT%H:%M:%S')
+        source = tmp_path_factory.mktemp('events') / 'events.jsonl'
+        write_events(source, events)
+        while dataset.ingest_batch(str(source)):
+            pass
+        assert dataset.apply_new_parts() == 1
+    if engine == 'duckdb':
+        pytest.importorskip('duckdb')
+
+    frame = dataset.DATA['frame']
+    end = frame['date'].iloc[-1].normalize()
+    start = end - pd.Timedelta(days=19)
+    daily = dataset.QUERY_ENGINES[engine]('base', start, end, 'All', 'All', 'All', by=['date'], measures=['rows'])
+    rows = frame[(frame['date'] >= start) & (frame['date'] < end + pd.Timedelta(days=1))]
+    assert (rows['date'] != rows['date'].dt.normalize()).any()
+    assert list(daily['date']) == list(pd.date_range(start, end))
+    assert daily['rows'].sum() == len(rows)
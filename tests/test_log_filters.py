@@ -0,0 +1,48 @@
+import pytest
+
+START, END = '2023-01-10', '2023-04-20'
+FILTERS = [START, END, 'All', 'All', 'All']
+
+
+def total(dataset, filter_query):
+    return dataset.log_page(FILTERS, 0, 10, [], filter_query)[1]
+
+
+@pytest.mark.parametrize('part, expected', [
+    ('{country} is blank', ('country', 'is blank', '')),
+    ('{country} is nonblank', ('country', 'is nonblank', '')),
+    ('{country} contains Ken', ('country', 'contains', 'Ken')),
+    ('{country} icontains "ken"', ('country', 'icontains', 'ken')),
+    ('{country} scontains Ken', ('country', 'scontains', 'Ken')),
+    ('{date} ge 2023-02', ('date', 'ge', '2023-02')),
+    ('{details} contains "Mobile App"', ('details', 'contains', 'Mobile App')),
+    ('{details} eq "Cloud Engineer - Login - John Doe"', ('details', 'eq', 'Cloud Engineer - Login - John Doe')),
+    ('{country}  <= Kenya', ('country', 'le', 'Kenya')),
+])
+def test_split_filter_part(dataset, part, expected):
+    assert dataset.split_filter_part(part) == expected
+
+
+def test_blank_filters(dataset):
+    everything = total(dataset, '')
+    assert total(dataset, '{country} is blank') == 0
+    assert total(dataset, '{country} is nonblank') == everything
+    assert total(dataset, '{date} is blank') == 0
+    assert total(dataset, '{date} is nonblank') == everything
+    assert total(dataset, '{details} is nonblank && {country} contains Kenya') == total(dataset, '{country} eq Kenya')
+
+
+def test_contains_is_case_sensitive(dataset):
+    kenya = total(dataset, '{country} eq Kenya')
+    assert kenya > 0
+    assert total(dataset, '{country} contains Kenya') == kenya
+    assert total(dataset, '{country} contains kenya') == 0
+    assert total(dataset, '{country} scontains kenya') == 0
+    assert total(dataset, '{country} icontains kenya') == kenya
+
+
+def test_value_with_operator_word(dataset):
+    rows = dataset.filter_rows(*FILTERS)
+    jobs = dataset.DATA['frame']['job_title'].to_numpy()[rows]
+    assert total(dataset, '{details} contains "Mobile App"') == (jobs == 'Mobile App Developer').sum() > 0
+    assert total(dataset, '{details} contains "Cloud Engineer"') == (jobs == 'Cloud Engineer').sum() > 0
@@ -0,0 +1,27 @@
+import pandas as pd
+
+FILTERS = ('2023-01-01', '2023-01-31', 'All', 'All', 'All')
+
+
+def test_zoom_out_stays_within_the_filter(dataset):
+    series, granularity = dataset.trend_series(FILTERS, ['2022-12-01', '2023-02-28'], [], None)
+    assert granularity == 'day'
+    assert list(series['date']) == list(pd.date_range('2023-01-01', '2023-01-31'))
+
+
+def test_pan_is_clamped_to_the_filter(dataset):
+    series, _ = dataset.trend_series(FILTERS, ['2023-01-20', '2023-02-20'], [], None)
+    assert list(series['date']) == list(pd.date_range('2023-01-20', '2023-01-31'))
+
+
+def test_hourly_zoom_includes_the_whole_last_day(dataset):
+    series, granularity = dataset.trend_series(FILTERS, ['2023-01-30', '2023-02-05'], [], None)
+    assert granularity == 'hour'
+    assert series['date'].min() >= pd.Timestamp('2023-01-30')
+    assert series['date'].max().normalize() == pd.Timestamp('2023-01-31')
+
+
+def test_pan_outside_the_filter_is_empty(dataset):
+    series, _ = dataset.trend_series(FILTERS, ['2023-03-01', '2023-03-31'], ['salesperson'], None)
+    assert series.empty
+    assert list(series.columns) == ['date', 'salesperson', 'sales']